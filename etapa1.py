@@ -1,16 +1,23 @@
 #!/usr/bin/env python3
 """
 Programa para concatenar vídeos da pasta sources na pasta output
-Etapa 1C: Trim, concatenação e normalização em 3 passos separados
+Etapa 1C: Trim, concatenação e normalização em um único passo do ffmpeg
 """
 
 import os
 import subprocess
-import glob
+import json
+import re
 import tempfile
 from pathlib import Path
 from datetime import datetime
 import time
+import asyncio
+import threading
+from collections import deque
+from functools import lru_cache
+
+from pipeline_utils import STDERR_TAIL_LINES, escape_concat_path, run_ffmpeg
 
 # =============================================================================
 # CONFIGURAÇÕES - ALTERE AQUI CONFORME NECESSÁRIO
@@ -24,8 +31,8 @@ OUTPUT_DIR = "output"
 MAX_VIDEOS = 59
 TRIM_SECONDS = 1.0
 
-# Extensões de vídeo suportadas
-VIDEO_EXTENSIONS = ['*.mp4', '*.MP4', '*.avi', '*.mov', '*.mkv']
+# Extensões de vídeo suportadas (comparadas sem diferenciar maiúsculas/minúsculas)
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv'}
 
 # Configurações de vídeo - MANTER RESOLUÇÃO ORIGINAL (4K)
 OUTPUT_WIDTH = None  # Manter largura original
@@ -37,18 +44,38 @@ VIDEO_PRESET = None   # Não aplicável com copy
 VIDEO_QUALITY = None  # Não aplicável com copy
 
 # Configurações de áudio
-AUDIO_CODEC = 'aac'
+AUDIO_CODEC = 'auto'  # 'auto' = melhor encoder AAC disponível no ffmpeg | ou fixo: 'aac', 'libfdk_aac'...
 AUDIO_BITRATE = '128k'
+AAC_ENCODERS_PREFERENCE = ['libfdk_aac', 'aac_at', 'aac']  # Mais rápido/melhor primeiro
+
+# Propriedades do stream de vídeo que precisam coincidir para concatenar com copy
+STREAM_SIGNATURE_FIELDS = ('codec_name', 'profile', 'width', 'height', 'pix_fmt', 'time_base')
 
 # Configurações de fade e normalização
-FADE_IN_DURATION = 1.0  # Duração do fade in em segundos (início do vídeo)
+FADE_IN_DURATION = 1.0  # Duração do fade in em segundos (início do vídeo) | 0 = sem fade in
 USE_LOUDNORM = False  # True = aplicar normalização loudnorm | False = apenas fade in
+LOUDNORM_TARGET = 'I=-16:LRA=11:TP=-1.5'  # Alvos EBU R128 (loudness, range, true peak)
+
+# Medições do passo 1 do loudnorm repassadas ao passo 2 (modo linear)
+LOUDNORM_MEASURED_KEYS = {
+    'measured_I': 'input_i',
+    'measured_LRA': 'input_lra',
+    'measured_TP': 'input_tp',
+    'measured_thresh': 'input_thresh',
+    'offset': 'target_offset'
+}
+
+def build_audio_filter(loudnorm_args=LOUDNORM_TARGET):
+    """Monta a cadeia de filtros de áudio (vazia = nada a processar)"""
+    filters = []
+    if FADE_IN_DURATION > 0:
+        filters.append(f'afade=t=in:st=0:d={FADE_IN_DURATION}')  # Fade in
+    if USE_LOUDNORM:
+        filters.append(f'loudnorm={loudnorm_args}')  # Normalização
+    return ','.join(filters)
 
-# Construir filtro de áudio baseado nas configurações
-if USE_LOUDNORM:
-    AUDIO_FILTER = f'afade=t=in:st=0:d={FADE_IN_DURATION},loudnorm'  # Fade in + normalização
-else:
-    AUDIO_FILTER = f'afade=t=in:st=0:d={FADE_IN_DURATION}'  # Apenas fade in
+# Filtro de áudio baseado nas configurações (loudnorm em passo único)
+AUDIO_FILTER = build_audio_filter()
 
 # =============================================================================
 
@@ -72,134 +99,237 @@ def validate_config():
     
     return True
 
-def get_video_duration(video_path):
-    """Obtém a duração de um vídeo usando ffprobe"""
-    cmd = [
+def find_source_videos():
+    """Lista os vídeos da pasta de origem em uma única varredura, ordenados e sem duplicatas
+    
+    Os caminhos já saem absolutos (diretório resolvido uma única vez).
+    """
+    with os.scandir(os.path.abspath(SOURCES_DIR)) as entries:
+        return sorted({
+            entry.path for entry in entries
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in VIDEO_EXTENSIONS
+        })
+
+@lru_cache(maxsize=None)
+def get_audio_codec():
+    """Resolve o encoder AAC a usar (consulta 'ffmpeg -encoders' uma única vez)"""
+    if AUDIO_CODEC != 'auto':
+        return AUDIO_CODEC
+    try:
+        cmd = ['ffmpeg', '-hide_banner', '-encoders']
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+        for encoder in AAC_ENCODERS_PREFERENCE:
+            if re.search(rf'^\s*A\S*\s+{encoder}\s', result.stdout, re.MULTILINE):
+                return encoder
+    except Exception:
+        pass
+    return 'aac'
+
+def audio_codec_args():
+    """Argumentos de encode do áudio para o encoder AAC escolhido"""
+    codec = get_audio_codec()
+    args = ['-c:a', codec, '-b:a', AUDIO_BITRATE]
+    if codec == 'libfdk_aac':
+        args.extend(['-profile:a', 'aac_low'])
+    return args
+
+def run_ffmpeg_with_progress(cmd, total_duration):
+    """Executa o ffmpeg mostrando o progresso lido de '-progress pipe:1' (total_duration em segundos)
+    
+    Como o run_ffmpeg do pipeline_utils, guarda só as últimas STDERR_TAIL_LINES linhas do stderr.
+    Retorna (returncode, últimas linhas do stderr).
+    """
+    tail = deque(maxlen=STDERR_TAIL_LINES)
+    
+    # Progresso em formato chave=valor no stdout; stderr drenado em thread para não travar o pipe
+    cmd = [cmd[0], '-progress', 'pipe:1', '-nostats', *cmd[1:]]
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors='replace'
+    )
+    stderr_thread = threading.Thread(target=tail.extend, args=(proc.stderr,), daemon=True)
+    stderr_thread.start()
+    
+    done = 0.0
+    speed = ''
+    for line in proc.stdout:
+        key, _, value = line.strip().partition('=')
+        if key == 'out_time_us' and value.isdigit():
+            done = min(int(value) / 1_000_000, total_duration)
+        elif key == 'speed':
+            speed = value
+        elif key == 'progress':
+            # Fim de cada bloco de progresso
+            percent = 100 * done / total_duration if total_duration > 0 else 100
+            print(f"\r    ⏳ {percent:5.1f}% ({format_time(done)}/{format_time(total_duration)}) {speed}", end='', flush=True)
+            if value == 'end':
+                print()
+    
+    returncode = proc.wait()
+    stderr_thread.join()
+    return returncode, ''.join(tail)
+
+async def probe_video_async(video_path):
+    """Obtém duração e propriedades do stream de vídeo com um único ffprobe, sem bloquear o event loop"""
+    proc = await asyncio.create_subprocess_exec(
         'ffprobe',
         '-v', 'quiet',
-        '-show_entries', 'format=duration',
-        '-of', 'csv=p=0',
-        video_path
-    ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
+        '-select_streams', 'v:0',
+        '-show_entries', f"format=duration:stream={','.join(STREAM_SIGNATURE_FIELDS)}",
+        '-of', 'json',
+        video_path,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL
+    )
+    stdout, _ = await proc.communicate()
+    if proc.returncode != 0:
+        return None
+    try:
+        data = json.loads(stdout)
+        duration = float(data['format']['duration'])
+    except (json.JSONDecodeError, KeyError, ValueError):
         return None
-    return float(result.stdout.strip())
+    
+    streams = data.get('streams') or [{}]
+    return {
+        'duration': duration,
+        'signature': tuple(streams[0].get(field) for field in STREAM_SIGNATURE_FIELDS)
+    }
 
-def trim_video(input_video, output_video, apply_fade_in=False):
-    """Aplica trim em um vídeo e opcionalmente fade in (apenas para o primeiro vídeo)"""
-    duration = get_video_duration(input_video)
-    if duration is None:
-        print(f"    ❌ Erro: Não foi possível obter duração de {input_video}")
-        return False
+async def _probe_all(video_list):
+    return await asyncio.gather(*(probe_video_async(video) for video in video_list))
+
+def probe_videos(video_list):
+    """Obtém duração e propriedades de todos os vídeos de uma vez (ffprobe concorrentes via asyncio)"""
+    return asyncio.run(_probe_all(video_list))
+
+def check_concat_compatibility(video_list, probes):
+    """Confere se todos os vídeos têm o mesmo codec/perfil/resolução/timebase do primeiro
     
-    end_time = duration - TRIM_SECONDS
-    
-    if apply_fade_in:
-        # Primeiro vídeo: trim + fade in (mais eficiente aplicar aqui!)
-        cmd_trim = [
-            'ffmpeg', '-y',
-            '-i', input_video,
-            '-ss', str(TRIM_SECONDS),
-            '-to', str(end_time),
-            '-c:v', 'copy',  # Vídeo sem re-encodificar
-            '-af', f'afade=t=in:st=0:d={FADE_IN_DURATION}',  # Fade in no áudio
-            '-c:a', AUDIO_CODEC,
-            '-b:a', AUDIO_BITRATE,
-            output_video
-        ]
-    else:
-        # Demais vídeos: apenas trim (copy codec)
-        cmd_trim = [
-            'ffmpeg', '-y',
-            '-i', input_video,
-            '-ss', str(TRIM_SECONDS),
-            '-to', str(end_time),
-            '-c', 'copy',
-            output_video
-        ]
+    O concat demuxer com -c copy só gera um arquivo válido nessas condições.
+    """
+    reference = probes[0]['signature']
+    compatible = True
+    for video, probe in zip(video_list[1:], probes[1:]):
+        if probe['signature'] != reference:
+            differences = [
+                f"{field}: {expected} vs {found}"
+                for field, expected, found in zip(STREAM_SIGNATURE_FIELDS, reference, probe['signature'])
+                if expected != found
+            ]
+            print(f"    ❌ {os.path.basename(video)} incompatível com {os.path.basename(video_list[0])} ({', '.join(differences)})")
+            compatible = False
+    return compatible
+
+def measure_loudness(list_file):
+    """Passo 1 do loudnorm: mede o áudio concatenado (sem demuxar o vídeo) e retorna o JSON"""
+    fade_filter = f'afade=t=in:st=0:d={FADE_IN_DURATION},' if FADE_IN_DURATION > 0 else ''
+    cmd = [
+        'ffmpeg', '-hide_banner',
+        '-f', 'concat',
+        '-safe', '0',
+        '-i', list_file,
+        '-vn',  # Apenas o áudio - ignora os pixels 4K
+        '-af', f'{fade_filter}loudnorm={LOUDNORM_TARGET}:print_format=json',
+        '-f', 'null', '-'
+    ]
     
-    result = subprocess.run(cmd_trim, capture_output=True, text=True)
-    if result.returncode != 0:
-        print(f"    ❌ Erro no trim: {result.stderr}")
-        return False
+    returncode, stderr_tail = run_ffmpeg(cmd)
+    if returncode != 0:
+        print(f"    ⚠️ Erro ao medir loudness: {stderr_tail}")
+        return None
     
-    return True
+    match = re.search(r'\{[^{}]+\}', stderr_tail)
+    if not match:
+        return None
+    try:
+        measured = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return None
+    
+    if not all(field in measured for field in LOUDNORM_MEASURED_KEYS.values()):
+        return None
+    return measured
 
-def concat_videos(video_list, output_video):
-    """Concatena uma lista de vídeos (SEM normalização) - MANTÉM RESOLUÇÃO ORIGINAL"""
-    if len(video_list) == 1:
-        # Apenas 1 vídeo, copia
-        cmd = [
-            'ffmpeg', '-y', 
-            '-i', video_list[0],
-            '-c', 'copy',  # Copia tudo sem re-encodificar
-            output_video
-        ]
-    else:
-        # Múltiplos vídeos, concatena com copy (mesma resolução)
-        # Criar arquivo de lista para concatenação mais eficiente
-        list_file = output_video.replace('.mp4', '_list.txt')
-        
-        with open(list_file, 'w') as f:
-            for video in video_list:
-                # Usar caminho absoluto para evitar problemas
-                abs_path = os.path.abspath(video)
-                f.write(f"file '{abs_path}'\n")
-        
-        cmd = [
-            'ffmpeg', '-y',
-            '-f', 'concat',
-            '-safe', '0',
-            '-i', list_file,
-            '-c', 'copy',  # Copia tudo sem re-encodificar
-            output_video
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        # Limpar arquivo de lista
-        if os.path.exists(list_file):
-            os.remove(list_file)
-        
-        if result.returncode != 0:
-            print(f"    ❌ Erro na concatenação: {result.stderr}")
-        return result.returncode == 0
-
-def normalize_audio(input_video, output_video):
-    """Aplica normalização de áudio em um vídeo (loudnorm, sem fade in pois já foi aplicado)"""
+def concat_videos(video_list, durations, output_video):
+    """Concatena os vídeos e processa o áudio em uma única invocação do ffmpeg
+    
+    O trim é feito no próprio concat demuxer (inpoint/outpoint) e o fade in/loudnorm
+    é aplicado no mesmo passo - nenhum arquivo intermediário é gravado.
+    MANTÉM RESOLUÇÃO ORIGINAL (vídeo sempre copiado).
+    """
+    # Criar arquivo de lista com os pontos de corte de cada vídeo
+    list_file = output_video.replace('.mp4', '_list.txt')
+    
+    # Caminhos já absolutos (find_source_videos); apóstrofos escapados para o parser do concat
+    payload = ''.join(
+        f"file '{escape_concat_path(video)}'\n"
+        f"inpoint {TRIM_SECONDS}\n"
+        f"outpoint {duration - TRIM_SECONDS}\n"
+        for video, duration in zip(video_list, durations)
+    )
+    with open(list_file, 'w', encoding='utf-8') as f:
+        f.write(payload)
+    
+    audio_filter = AUDIO_FILTER
     if USE_LOUDNORM:
-        # Aplicar apenas loudnorm (fade in já foi aplicado no primeiro vídeo!)
-        cmd = [
-            'ffmpeg', '-y',
-            '-i', input_video,
-            '-c:v', 'copy',  # Copia vídeo sem re-encodificar
-            '-af', 'loudnorm',  # Apenas normalização, sem fade in
-            '-c:a', AUDIO_CODEC,
-            '-b:a', AUDIO_BITRATE,
-            output_video
+        # Loudnorm em dois passos: mede primeiro, depois aplica ganho linear (mais barato)
+        print(f"  📏 Medindo loudness (passo 1 do loudnorm, apenas áudio)...")
+        measured = measure_loudness(list_file)
+        if measured:
+            measured_args = ':'.join(f"{key}={measured[field]}" for key, field in LOUDNORM_MEASURED_KEYS.items())
+            audio_filter = build_audio_filter(f"{LOUDNORM_TARGET}:{measured_args}:linear=true")
+        else:
+            print(f"  ⚠️ Medição falhou - usando loudnorm em passo único")
+    
+    if audio_filter:
+        # Vídeo copiado, apenas o áudio passa pelo filtro (fade in + loudnorm se ativado)
+        codec_args = [
+            '-c:v', 'copy',
+            '-af', audio_filter,
+            *audio_codec_args()
         ]
     else:
-        # Sem loudnorm: apenas copiar (fade in já foi aplicado no primeiro vídeo!)
-        cmd = [
-            'ffmpeg', '-y',
-            '-i', input_video,
-            '-c', 'copy',  # Copiar tudo sem processar
-            output_video
-        ]
+        codec_args = ['-c', 'copy']  # Copia tudo sem re-encodificar
+    
+    cmd = [
+        'ffmpeg', '-y',
+        '-f', 'concat',
+        '-safe', '0',
+        '-i', list_file,
+        '-map', '0:v:0',  # Apenas o primeiro stream de vídeo...
+        '-map', '0:a:0?',  # ...e o primeiro de áudio, se existir
+        '-dn', '-sn',  # Sem streams de dados (telemetria GoPro) e legendas
+        '-ignore_unknown',
+        *codec_args,
+        output_video
+    ]
     
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    return result.returncode == 0
+    output_duration = sum(duration - 2 * TRIM_SECONDS for duration in durations)
+    returncode, stderr_tail = run_ffmpeg_with_progress(cmd, output_duration)
+    
+    # Limpar arquivo de lista (um único syscall, sem stat prévio)
+    try:
+        os.remove(list_file)
+    except FileNotFoundError:
+        pass
+    
+    if returncode != 0:
+        print(f"    ❌ Erro na concatenação: {stderr_tail}")
+    return returncode == 0
 
 def format_time(seconds):
     """Formata tempo em HH:MM:SS"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
     return f"{hours:02d}:{minutes:02d}:{secs:02d}"
 
 def main():
     start_time = time.time()
+    run_ts = datetime.now().strftime("%Y%m%d_%H%M%S")  # Timestamp único por execução
     
     # Validar configurações
     if not validate_config():
@@ -208,11 +338,7 @@ def main():
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
     # Encontrar vídeos
-    video_files = []
-    for ext in VIDEO_EXTENSIONS:
-        video_files.extend(glob.glob(os.path.join(SOURCES_DIR, ext)))
-    video_files = list(set(video_files))
-    video_files.sort()
+    video_files = find_source_videos()
 
     if not video_files:
         print(f"❌ Nenhum arquivo de vídeo encontrado na pasta '{SOURCES_DIR}'")
@@ -224,92 +350,50 @@ def main():
 
     print(f"📹 Processando {len(video_files)} vídeos")
     print(f"⏱️  Resolução: ORIGINAL (4K) - SEM REDIMENSIONAMENTO")
-    print(f"🔧 Trim: {TRIM_SECONDS}s | Codec: {VIDEO_CODEC} | Áudio: {AUDIO_CODEC}")
-    print(f"🎚️  Fade In: {FADE_IN_DURATION}s (aplicado no PRIMEIRO vídeo)")
+    print(f"🔧 Trim: {TRIM_SECONDS}s (inpoint/outpoint no concat) | Codec: {VIDEO_CODEC} | Áudio: {get_audio_codec()}")
+    print(f"🎚️  Fade In: {FADE_IN_DURATION}s (aplicado no início do vídeo final)")
     
     if USE_LOUDNORM:
         print(f"🔊 Normalização: loudnorm aplicado no vídeo final")
     else:
-        print(f"⚡ SEM normalização (apenas copy - máxima velocidade!)")
+        print(f"⚡ SEM normalização (apenas fade in no áudio)")
     
-    print("🚀 ULTRA OTIMIZADO: Copy codec + resolução original + fade in otimizado!")
+    print("🚀 ULTRA OTIMIZADO: Copy codec + resolução original + trim sem arquivos intermediários!")
     print("=" * 60)
 
-    # Passo 1: Apenas trim dos vídeos (sem normalização)
-    print("🔄 Passo 1/3: Aplicando TRIM nos vídeos...")
-    processed_videos = []
-    trim_start = time.time()
-    
-    for i, video in enumerate(video_files, 1):
-        elapsed = time.time() - start_time
-        
-        # Indicar se é o primeiro vídeo (aplicar fade in)
-        is_first = (i == 1)
-        video_info = f"  {i}/{len(video_files)}: {os.path.basename(video)}"
-        if is_first:
-            video_info += " [FADE IN]"
-        print(f"{video_info} - {format_time(elapsed)}")
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-        processed_file = os.path.join(OUTPUT_DIR, f"trimmed_{i:02d}_{timestamp}_{os.path.basename(video)}")
-        
-        # Aplicar fade in apenas no primeiro vídeo!
-        if not trim_video(video, processed_file, apply_fade_in=is_first):
-            print(f"❌ Erro ao processar {os.path.basename(video)}")
-            return
-        
-        processed_videos.append(processed_file)
-
-    trim_time = time.time() - trim_start
-    print(f"✅ TRIM concluído em {format_time(trim_time)}")
-
-    # Passo 2: Concatenar vídeos (sem normalização)
-    print(f"\n🔄 Passo 2/3: CONCATENANDO vídeos...")
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    temp_concat = os.path.join(OUTPUT_DIR, f"temp_{timestamp}_concatenated.mp4")
+    # Durações e propriedades de todos os vídeos obtidas de uma vez (ffprobe concorrentes)
+    probe_start = time.time()
+    probes = probe_videos(video_files)
+    print(f"🔍 Vídeos analisados ({len(video_files)} ffprobe concorrentes) em {time.time() - probe_start:.2f}s")
     
-    concat_start = time.time()
-    print(f"  📎 Concatenando {len(processed_videos)} vídeos...")
+    for video, probe in zip(video_files, probes):
+        if probe is None:
+            print(f"❌ Erro: Não foi possível analisar {video}")
+            return
     
-    if not concat_videos(processed_videos, temp_concat):
-        print("❌ Erro na concatenação")
+    # Validar ANTES de concatenar: com -c copy, vídeos diferentes geram saída corrompida
+    if not check_concat_compatibility(video_files, probes):
+        print("❌ Vídeos incompatíveis para concatenação sem re-encodificação")
         return
     
-    concat_time = time.time() - concat_start
-    print(f"✅ CONCATENAÇÃO concluída em {format_time(concat_time)}")
+    durations = [probe['duration'] for probe in probes]
 
-    # Passo 3: Normalizar áudio do vídeo concatenado (fade in já foi aplicado!)
-    if USE_LOUDNORM:
-        print(f"\n🔄 Passo 3/3: NORMALIZANDO áudio do vídeo final...")
+    # Passo único: concatenação com trim (inpoint/outpoint) + áudio processado no mesmo ffmpeg
+    if AUDIO_FILTER:
+        print(f"🔄 Passo 1/1: CONCATENANDO vídeos (TRIM + {AUDIO_FILTER})...")
     else:
-        print(f"\n🔄 Passo 3/3: FINALIZANDO vídeo concatenado...")
-    
-    final_output = os.path.join(OUTPUT_DIR, f"{timestamp}_concatenated_videos.mp4")
+        print(f"🔄 Passo 1/1: CONCATENANDO vídeos (TRIM, copy total)...")
+    final_output = os.path.join(OUTPUT_DIR, f"{run_ts}_concatenated_videos.mp4")
     
-    normalize_start = time.time()
-    
-    if USE_LOUDNORM:
-        print(f"  🔊 Aplicando loudnorm no áudio (fade in já aplicado)...")
-    else:
-        print(f"  📋 Copiando vídeo final (fade in já aplicado)...")
+    concat_start = time.time()
+    print(f"  📎 Concatenando {len(video_files)} vídeos...")
     
-    if not normalize_audio(temp_concat, final_output):
-        if USE_LOUDNORM:
-            print("❌ Erro na normalização")
-        else:
-            print("❌ Erro ao finalizar vídeo")
+    if not concat_videos(video_files, durations, final_output):
+        print("❌ Erro na concatenação")
         return
     
-    normalize_time = time.time() - normalize_start
-    
-    if USE_LOUDNORM:
-        print(f"✅ NORMALIZAÇÃO concluída em {format_time(normalize_time)}")
-    else:
-        print(f"✅ VÍDEO FINAL copiado em {format_time(normalize_time)}")
-
-    # Limpeza do arquivo temporário
-    if os.path.exists(temp_concat):
-        os.remove(temp_concat)
+    concat_time = time.time() - concat_start
+    print(f"✅ CONCATENAÇÃO concluída em {format_time(concat_time)}")
 
     # Resultado final
     total_time = time.time() - start_time
@@ -318,35 +402,24 @@ def main():
     print(f"📁 Arquivo final: {final_output}")
     print(f"⏱️  Tempo total: {format_time(total_time)}")
     print(f"📊 Breakdown dos tempos:")
-    print(f"   • TRIM (fade in no 1º vídeo): {format_time(trim_time)}")
-    print(f"   • CONCATENAÇÃO: {format_time(concat_time)}")
-    
-    if USE_LOUDNORM:
-        print(f"   • NORMALIZAÇÃO (loudnorm): {format_time(normalize_time)}")
-    else:
-        print(f"   • FINALIZAÇÃO (copy): {format_time(normalize_time)}")
+    print(f"   • CONCATENAÇÃO (trim + áudio em um único passo): {format_time(concat_time)}")
     
     if os.path.exists(final_output):
         file_size = os.path.getsize(final_output) / (1024 * 1024)
         print(f"📊 Tamanho: {file_size:.2f} MB")
     
-    # Limpeza
-    print("\n🧹 Limpando arquivos temporários...")
-    for video in processed_videos:
-        if os.path.exists(video):
-            os.remove(video)
-    print("✅ Limpeza concluída!")
     print("\n🚀 ULTRA OTIMIZAÇÃO APLICADA:")
-    print("   • TRIM rápido (copy codec)")
-    print(f"   • FADE IN ({FADE_IN_DURATION}s) aplicado no PRIMEIRO vídeo (muito mais rápido!)")
-    print("   • CONCATENAÇÃO com resolução 4K original")
+    print("   • TRIM direto no concat demuxer (ZERO arquivos intermediários)")
+    print(f"   • FADE IN ({FADE_IN_DURATION}s) aplicado no áudio do vídeo final")
+    print("   • CONCATENAÇÃO + áudio em um ÚNICO ffmpeg (sem arquivo temporário)")
+    print("   • Resolução 4K original")
     
     if USE_LOUDNORM:
         print("   • NORMALIZAÇÃO loudnorm apenas no vídeo final")
     else:
-        print("   • SEM normalização (apenas copy - instantâneo!)")
+        print("   • SEM normalização (apenas fade in)")
     
-    print("   • ZERO re-encodificação desnecessária")
+    print("   • ZERO re-encodificação de vídeo")
     print("   • Etapa 2 será 100x mais rápida!")
 
 if __name__ == "__main__":
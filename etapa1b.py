@@ -7,16 +7,25 @@ NÃO re-encoda vídeos - apenas mapeia e cria PNGs.
 """
 
 import os
+import re
 import json
 import subprocess
-import glob
+import hashlib
+import shutil
 import time
+import threading
+from functools import lru_cache
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 from PIL import Image, ImageDraw, ImageFont
 
+from pipeline_utils import file_cache_key, json_loads, write_json
+
 # Importa configurações
 try:
     import config
@@ -39,6 +48,15 @@ except ImportError:
         print("⚠️ Usando Nominatim como fallback...")
         USE_GOOGLE_MAPS = False
 
+# Cliente Google Maps criado uma única vez (mantém a sessão HTTP entre consultas)
+GOOGLE_MAPS_CLIENT = None
+if USE_GOOGLE_MAPS and GOOGLEMAPS_AVAILABLE and GOOGLE_MAPS_API_KEY:
+    try:
+        GOOGLE_MAPS_CLIENT = googlemaps.Client(key=GOOGLE_MAPS_API_KEY)
+    except Exception as e:
+        print(f"⚠️ Erro ao criar cliente Google Maps: {e}")
+        print("⚠️ Usando Nominatim como fallback...")
+
 # =============================================================================
 # CONFIGURAÇÕES
 # =============================================================================
@@ -47,34 +65,144 @@ SOURCES_DIR = "sources"
 OUTPUT_DIR = "output"
 # LOCATIONS_MAP_FILE será gerado com timestamp no main()
 
-# Extensões de vídeo suportadas
-VIDEO_EXTENSIONS = ['*.mp4', '*.MP4', '*.avi', '*.mov', '*.mkv']
+# Extensões de vídeo suportadas (comparadas em minúsculas)
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv'}
 
 # Limitações
 MAX_VIDEOS = 59
+MAX_WORKERS = 8  # Vídeos processados em paralelo (ffprobe + geocoding + PNG)
+PNG_SAVE_WORKERS = 2  # Threads dedicadas ao encode (zlib) dos PNGs
+
+# Cache de geocoding (coordenadas arredondadas para ~11 m)
+GEOCODE_CACHE_FILE = os.path.join(OUTPUT_DIR, "geocode_cache.json")
+GEOCODE_CACHE_PRECISION = 4  # Casas decimais de lat/lon na chave do cache
+
+# Cache de metadados do ffprobe (invalidado quando o arquivo muda: mtime/tamanho)
+FFPROBE_CACHE_FILE = os.path.join(OUTPUT_DIR, "ffprobe_cache.json")
+
+# Cache de PNGs de lower third por (endereço, resolução) - clipes do mesmo local reaproveitam
+PNG_CACHE_DIR = os.path.join(OUTPUT_DIR, ".pngcache")
 
 # Configurações de Lower Third
 ACCENT_COLOR = (66, 133, 244, 255)  # Azul #4285F4
 SUBTITLE_COLOR = (255, 255, 255, 255)  # Branco
+LOWER_THIRD_TOP_RATIO = 0.60  # PNG cobre só de 60% da altura para baixo (pin começa em ~66%)
+LOWER_THIRD_RENDER_VERSION = 1  # Incrementar ao mudar layout/fontes do render (invalida o cache de PNGs)
 
 # =============================================================================
 # FUNÇÕES DE GPS E GEOCODING
 # =============================================================================
 
-def run_ffprobe_gps(file_path: str) -> Tuple[Optional[Dict], Optional[str]]:
-    """Executa ffprobe para extrair dados de GPS."""
+# Campos de GPS e as tags onde procurá-los, em ordem de prioridade
+GPS_TAG_LOOKUP = [
+    ('location', 'location'),
+    ('location', 'com.apple.quicktime.location.ISO6709'),
+    ('location', 'GPS'),
+    ('latitude', 'latitude'),
+    ('latitude', 'com.apple.quicktime.location.latitude'),
+    ('latitude', 'GPS:Latitude'),
+    ('longitude', 'longitude'),
+    ('longitude', 'com.apple.quicktime.location.longitude'),
+    ('longitude', 'GPS:Longitude'),
+    ('timestamp', 'creation_time'),
+    ('timestamp', 'com.apple.quicktime.creationdate'),
+    ('timestamp', 'GPS:TimeStamp')
+]
+
+# Sessão HTTP persistente para o Nominatim (keep-alive: sem novo handshake TLS por consulta)
+NOMINATIM_SESSION = requests.Session()
+NOMINATIM_SESSION.headers.update({
+    'User-Agent': 'FFmpegVideoProcessor/1.0 (Video GPS Analysis)'
+})
+NOMINATIM_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=MAX_WORKERS,
+    max_retries=Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
+))
+
+# Localização GoPro: "+lat+lon/" (ex: "-23.5505-46.6333/")
+GOPRO_LOCATION_RE = re.compile(r'^(-?\d+\.\d+)(-?\d+\.\d+)$')
+
+# CEP no fim do endereço (ex: " - 01310-100")
+CEP_RE = re.compile(r'\s*-?\s*\d{5}-?\d{3}\s*$')
+
+# Lista completa de estados brasileiros com siglas
+BRAZIL_STATES = {
+    'São Paulo': 'SP', 'Rio de Janeiro': 'RJ', 'Minas Gerais': 'MG',
+    'Bahia': 'BA', 'Paraná': 'PR', 'Rio Grande do Sul': 'RS',
+    'Pernambuco': 'PE', 'Ceará': 'CE', 'Pará': 'PA', 'Goiás': 'GO',
+    'Santa Catarina': 'SC', 'Espírito Santo': 'ES', 'Distrito Federal': 'DF',
+    'Amazonas': 'AM', 'Mato Grosso': 'MT', 'Mato Grosso do Sul': 'MS',
+    'Rondônia': 'RO', 'Acre': 'AC', 'Roraima': 'RR', 'Amapá': 'AP',
+    'Tocantins': 'TO', 'Maranhão': 'MA', 'Piauí': 'PI', 'Alagoas': 'AL',
+    'Sergipe': 'SE', 'Paraíba': 'PB', 'Rio Grande do Norte': 'RN'
+}
+
+class RateLimiter:
+    """Garante um intervalo mínimo entre requisições, dormindo só o que faltar.
+    
+    Compartilhado entre threads: cada chamada a wait() reserva o próximo horário livre.
+    """
+    
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self.last_call = 0.0
+        self.lock = threading.Lock()
+    
+    def wait(self) -> None:
+        with self.lock:
+            delay = self.min_interval - (time.monotonic() - self.last_call)
+            if delay > 0:
+                time.sleep(delay)
+            self.last_call = time.monotonic()
+
+# Nominatim exige no máximo 1 req/s; Google Maps permite ~50 req/s, mas ficamos em 10 req/s
+NOMINATIM_LIMITER = RateLimiter(1.1)
+GOOGLE_MAPS_LIMITER = RateLimiter(0.1)
+
+def load_ffprobe_cache() -> Dict[str, Dict]:
+    """Carrega cache de metadados do ffprobe se existir."""
+    if os.path.exists(FFPROBE_CACHE_FILE):
+        try:
+            with open(FFPROBE_CACHE_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Erro ao carregar cache do ffprobe: {e}")
+    return {}
+
+def save_ffprobe_cache(ffprobe_cache: Dict[str, Dict]) -> None:
+    """Salva cache de metadados do ffprobe."""
+    try:
+        with open(FFPROBE_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(ffprobe_cache, f, ensure_ascii=False)
+        print(f"💾 Cache do ffprobe salvo: {os.path.basename(FFPROBE_CACHE_FILE)} ({len(ffprobe_cache)} vídeos)")
+    except Exception as e:
+        print(f"⚠️ Erro ao salvar cache do ffprobe: {e}")
+
+def run_ffprobe_gps(file_path: str, ffprobe_cache: Optional[Dict[str, Dict]] = None) -> Tuple[Optional[Dict], Optional[str]]:
+    """Executa ffprobe para extrair dados de GPS (consulta o cache primeiro, se fornecido)."""
     try:
+        key = file_cache_key(file_path) if ffprobe_cache is not None else None
+        if key is not None and key in ffprobe_cache:
+            return ffprobe_cache[key], None
+        
+        # Apenas tags (GPS) e dimensões - o JSON completo tem dezenas de KB por vídeo
         cmd = [
             "ffprobe", "-v", "quiet", "-print_format", "json",
-            "-show_format", "-show_streams", str(file_path)
+            "-show_entries", "format_tags:stream=codec_type,width,height:stream_tags",
+            str(file_path)
         ]
         
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        # Saída em bytes: o JSON (UTF-8) vai direto para o parser, sem decodificar antes
+        result = subprocess.run(cmd, capture_output=True, timeout=30)
         
         if result.returncode != 0:
-            return None, f"Erro ffprobe: {result.stderr}"
+            return None, f"Erro ffprobe: {result.stderr.decode('utf-8', errors='replace')}"
         
-        return json.loads(result.stdout), None
+        metadata = json_loads(result.stdout)
+        if key is not None:
+            ffprobe_cache[key] = metadata
+        return metadata, None
         
     except subprocess.TimeoutExpired:
         return None, "Timeout na execução do ffprobe"
@@ -87,37 +215,17 @@ def extract_gps_data(metadata: Dict) -> Dict:
     """Extrai dados de GPS dos metadados do ffprobe."""
     gps_data = {}
     
-    if 'format' in metadata and 'tags' in metadata['format']:
-        tags = metadata['format']['tags']
-        gps_fields = {
-            'location': ['location', 'com.apple.quicktime.location.ISO6709', 'GPS'],
-            'latitude': ['latitude', 'com.apple.quicktime.location.latitude', 'GPS:Latitude'],
-            'longitude': ['longitude', 'com.apple.quicktime.location.longitude', 'GPS:Longitude'],
-            'timestamp': ['creation_time', 'com.apple.quicktime.creationdate', 'GPS:TimeStamp']
-        }
-        
-        for field, possible_keys in gps_fields.items():
-            for key in possible_keys:
-                if key in tags:
-                    gps_data[field] = tags[key]
-                    break
-    
-    if 'streams' in metadata:
-        for stream in metadata['streams']:
-            if stream.get('codec_type') == 'video' and 'tags' in stream:
-                tags = stream['tags']
-                gps_fields = {
-                    'location': ['location', 'com.apple.quicktime.location.ISO6709', 'GPS'],
-                    'latitude': ['latitude', 'com.apple.quicktime.location.latitude', 'GPS:Latitude'],
-                    'longitude': ['longitude', 'com.apple.quicktime.location.longitude', 'GPS:Longitude'],
-                    'timestamp': ['creation_time', 'com.apple.quicktime.creationdate', 'GPS:TimeStamp']
-                }
-                for field, possible_keys in gps_fields.items():
-                    if field not in gps_data:
-                        for key in possible_keys:
-                            if key in tags:
-                                gps_data[field] = tags[key]
-                                break
+    # Tags do container têm prioridade sobre as dos streams de vídeo
+    tag_sources = [metadata.get('format', {}).get('tags', {})]
+    tag_sources.extend(
+        stream['tags'] for stream in metadata.get('streams', [])
+        if stream.get('codec_type') == 'video' and 'tags' in stream
+    )
+    
+    for tags in tag_sources:
+        for field, key in GPS_TAG_LOOKUP:
+            if field not in gps_data and key in tags:
+                gps_data[field] = tags[key]
     
     return gps_data
 
@@ -128,8 +236,7 @@ def parse_gopro_location(location_str: str) -> Tuple[Optional[float], Optional[f
             return None, None
         
         coords = location_str.rstrip('/')
-        import re
-        match = re.match(r'^(-?\d+\.\d+)(-?\d+\.\d+)$', coords)
+        match = GOPRO_LOCATION_RE.match(coords)
         
         if match:
             lat = float(match.group(1))
@@ -142,16 +249,14 @@ def parse_gopro_location(location_str: str) -> Tuple[Optional[float], Optional[f
 
 def reverse_geocode_google_maps(lat: float, lon: float) -> Optional[str]:
     """Converte coordenadas GPS em endereço usando Google Maps API."""
-    if not GOOGLEMAPS_AVAILABLE or not GOOGLE_MAPS_API_KEY:
+    if GOOGLE_MAPS_CLIENT is None:
         return None
     
     try:
-        # Rate limit: Google Maps permite ~50 req/s, mas vamos ser conservadores
-        # Adiciona delay de 0.1s entre requisições (10 req/s)
-        time.sleep(0.1)
+        # Rate limit: no máximo 10 req/s (só espera se a última chamada foi recente)
+        GOOGLE_MAPS_LIMITER.wait()
         
-        # Inicializa cliente Google Maps
-        gmaps = googlemaps.Client(key=GOOGLE_MAPS_API_KEY)
+        gmaps = GOOGLE_MAPS_CLIENT
         
         # Faz geocoding reverso com retry
         max_retries = 3
@@ -207,8 +312,7 @@ def reverse_geocode_google_maps(lat: float, lon: float) -> Optional[str]:
                     # Fallback: formatted_address simplificado
                     address = results[0].get('formatted_address', '')
                     address = address.replace(', Brasil', '').replace(', Brazil', '')
-                    import re
-                    address = re.sub(r'\s*-?\s*\d{5}-?\d{3}\s*$', '', address)
+                    address = CEP_RE.sub('', address)
                     return address.rstrip(',').strip() if address else None
                 
                 return None
@@ -233,7 +337,7 @@ def reverse_geocode_google_maps(lat: float, lon: float) -> Optional[str]:
         print(f"    ⚠️ Erro Google Maps: {e}")
         return None
 
-def reverse_geocode_nominatim(lat: float, lon: float) -> str:
+def reverse_geocode_nominatim(lat: float, lon: float) -> Optional[str]:
     """Converte coordenadas GPS em endereço usando Nominatim (OpenStreetMap)."""
     try:
         url = "https://nominatim.openstreetmap.org/reverse"
@@ -245,42 +349,80 @@ def reverse_geocode_nominatim(lat: float, lon: float) -> str:
             'accept-language': GEOCODING_LANGUAGE
         }
         
-        headers = {
-            'User-Agent': 'FFmpegVideoProcessor/1.0 (Video GPS Analysis)'
-        }
-        
-        # Respeita rate limit do Nominatim (1 req/sec)
-        time.sleep(1.1)
+        # Respeita rate limit do Nominatim (1 req/sec, só espera se a última chamada foi recente)
+        NOMINATIM_LIMITER.wait()
         
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        response = NOMINATIM_SESSION.get(url, params=params, timeout=10)
         
         if response.status_code == 200:
             data = response.json()
             return format_address(data.get('address', {}))
         else:
-            return f"Erro na API: {response.status_code}"
+            print(f"    ⚠️ Erro na API Nominatim: {response.status_code}")
+            return None
             
     except requests.exceptions.Timeout:
-        return "Timeout na consulta"
+        print("    ⚠️ Timeout na consulta ao Nominatim")
+        return None
     except requests.exceptions.RequestException as e:
-        return f"Erro de rede: {str(e)}"
+        print(f"    ⚠️ Erro de rede: {str(e)}")
+        return None
     except Exception as e:
-        return f"Erro: {str(e)}"
+        print(f"    ⚠️ Erro Nominatim: {str(e)}")
+        return None
+
+def load_geocode_cache() -> Dict[str, str]:
+    """Carrega cache de endereços já consultados se existir."""
+    if os.path.exists(GEOCODE_CACHE_FILE):
+        try:
+            with open(GEOCODE_CACHE_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Erro ao carregar cache de geocoding: {e}")
+    return {}
+
+def save_geocode_cache(geocode_cache: Dict[str, str]) -> None:
+    """Salva cache de endereços consultados."""
+    try:
+        with open(GEOCODE_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(geocode_cache, f, ensure_ascii=False, indent=2)
+        print(f"💾 Cache de geocoding salvo: {os.path.basename(GEOCODE_CACHE_FILE)} ({len(geocode_cache)} endereços)")
+    except Exception as e:
+        print(f"⚠️ Erro ao salvar cache de geocoding: {e}")
+
+def geocode_cache_key(lat: float, lon: float) -> str:
+    """Chave do cache: idioma + coordenadas arredondadas (clipes do mesmo local compartilham)."""
+    return f"{GEOCODING_LANGUAGE}:{lat:.{GEOCODE_CACHE_PRECISION}f},{lon:.{GEOCODE_CACHE_PRECISION}f}"
 
-def reverse_geocode(lat: float, lon: float) -> str:
+def reverse_geocode(lat: float, lon: float, geocode_cache: Optional[Dict[str, str]] = None) -> str:
     """Converte coordenadas GPS em endereço legível.
     
-    Usa Google Maps API se configurado, senão usa Nominatim (OSM) como fallback.
+    Consulta primeiro o cache (se fornecido); em caso de falta usa Google Maps API
+    se configurado, senão Nominatim (OSM) como fallback. Falhas não são cacheadas.
     """
+    key = geocode_cache_key(lat, lon)
+    if geocode_cache is not None and key in geocode_cache:
+        print("    💾 Endereço em cache")
+        return geocode_cache[key]
+    
+    address = None
+    
     # Tenta Google Maps primeiro se habilitado
-    if USE_GOOGLE_MAPS and GOOGLE_MAPS_API_KEY and GOOGLEMAPS_AVAILABLE:
+    if GOOGLE_MAPS_CLIENT is not None:
         address = reverse_geocode_google_maps(lat, lon)
-        if address:
-            return address
-        print("    ⚠️ Google Maps falhou, usando Nominatim...")
+        if not address:
+            print("    ⚠️ Google Maps falhou, usando Nominatim...")
     
     # Fallback para Nominatim
-    return reverse_geocode_nominatim(lat, lon)
+    if not address:
+        address = reverse_geocode_nominatim(lat, lon)
+    
+    if not address:
+        return "Localização não identificada"
+    
+    if geocode_cache is not None:
+        geocode_cache[key] = address
+    return address
 
 def format_address(address_data: Dict) -> str:
     """Formata dados de endereço em formato legível.
@@ -308,18 +450,7 @@ def format_address(address_data: Dict) -> str:
         # Estado (com hífen)
         if 'state' in address_data:
             state = address_data['state']
-            # Lista completa de estados brasileiros com siglas
-            states_map = {
-                'São Paulo': 'SP', 'Rio de Janeiro': 'RJ', 'Minas Gerais': 'MG',
-                'Bahia': 'BA', 'Paraná': 'PR', 'Rio Grande do Sul': 'RS',
-                'Pernambuco': 'PE', 'Ceará': 'CE', 'Pará': 'PA', 'Goiás': 'GO',
-                'Santa Catarina': 'SC', 'Espírito Santo': 'ES', 'Distrito Federal': 'DF',
-                'Amazonas': 'AM', 'Mato Grosso': 'MT', 'Mato Grosso do Sul': 'MS',
-                'Rondônia': 'RO', 'Acre': 'AC', 'Roraima': 'RR', 'Amapá': 'AP',
-                'Tocantins': 'TO', 'Maranhão': 'MA', 'Piauí': 'PI', 'Alagoas': 'AL',
-                'Sergipe': 'SE', 'Paraíba': 'PB', 'Rio Grande do Norte': 'RN'
-            }
-            state_abbr = states_map.get(state, state)
+            state_abbr = BRAZIL_STATES.get(state, state)
             
             # Adiciona com hífen se houver cidade
             if linha2_parts:
@@ -353,10 +484,9 @@ def format_address(address_data: Dict) -> str:
     except Exception as e:
         return f"Erro ao formatar endereço: {str(e)}"
 
-def get_video_dimensions(video_path: str) -> Tuple[int, int]:
-    """Obtém dimensões do vídeo."""
+def get_video_dimensions_from_meta(metadata: Optional[Dict]) -> Tuple[int, int]:
+    """Obtém dimensões do vídeo a partir dos metadados já extraídos pelo ffprobe."""
     try:
-        metadata, _ = run_ffprobe_gps(video_path)
         if metadata and 'streams' in metadata:
             for stream in metadata['streams']:
                 if stream.get('codec_type') == 'video':
@@ -368,12 +498,25 @@ def get_video_dimensions(video_path: str) -> Tuple[int, int]:
     
     return 1920, 1080
 
+def get_video_dimensions(video_path: str) -> Tuple[int, int]:
+    """Obtém dimensões do vídeo (executa ffprobe; prefira get_video_dimensions_from_meta)."""
+    metadata, _ = run_ffprobe_gps(video_path)
+    return get_video_dimensions_from_meta(metadata)
+
 # =============================================================================
 # FUNÇÕES DE CRIAÇÃO DE LOWER THIRD
 # =============================================================================
 
-def pick_font(paths: List[str], size: int) -> ImageFont.ImageFont:
-    """Seleciona fonte disponível."""
+# Pool de gravação dos PNGs: o encode roda em paralelo com ffprobe/geocoding dos próximos vídeos
+PNG_SAVE_POOL = ThreadPoolExecutor(max_workers=PNG_SAVE_WORKERS)
+
+# Gravações já disparadas nesta execução (arquivo do cache -> future), compartilhadas entre threads
+PNG_CACHE_SAVES: Dict[str, Future] = {}
+PNG_CACHE_LOCK = threading.Lock()
+
+@lru_cache(maxsize=32)
+def _pick_font_cached(paths: Tuple[str, ...], size: int) -> ImageFont.ImageFont:
+    """Carrega a primeira fonte disponível (uma vez por combinação de caminhos e tamanho)."""
     for path in paths:
         try:
             return ImageFont.truetype(path, size=size)
@@ -381,6 +524,10 @@ def pick_font(paths: List[str], size: int) -> ImageFont.ImageFont:
             continue
     return ImageFont.load_default()
 
+def pick_font(paths: List[str], size: int) -> ImageFont.ImageFont:
+    """Seleciona fonte disponível (reaproveita a fonte já carregada para a mesma resolução)."""
+    return _pick_font_cached(tuple(paths), size)
+
 def split_location_for_title_subtitle(location_text: str) -> Tuple[str, str]:
     """Divide texto de localização em título e subtítulo.
     
@@ -408,103 +555,169 @@ def split_location_for_title_subtitle(location_text: str) -> Tuple[str, str]:
     # Se não conseguiu dividir, retorna o texto original no título
     return location_text.upper(), ""
 
-def create_lower_third_png(location_text: str, output_path: str, width: int, height: int) -> bool:
-    """Cria PNG do lower third com pin."""
+def lower_third_offset_y(height: int) -> int:
+    """Posição vertical (no quadro do vídeo) do topo do PNG de lower third."""
+    return int(height * LOWER_THIRD_TOP_RATIO)
+
+def save_png(img: Image.Image, output_path: str) -> bool:
+    """Codifica e grava o PNG (chamada direta ou via PNG_SAVE_POOL)."""
     try:
-        img = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(img)
-        
-        WHITE = (255, 255, 255, 255)
-        ACCENT = ACCENT_COLOR
-        TXT_SUB = SUBTITLE_COLOR
-        
-        cx = width // 2
-        baseline_y = int(height * 0.82)
-        
-        # Fontes
-        title_font = pick_font([
-            "C:/Windows/Fonts/arialbd.ttf",
-            "C:/Windows/Fonts/segoeuib.ttf",
-            "C:/Windows/Fonts/calibrib.ttf"
-        ], int(height * 0.055))
-        
-        subtitle_font = pick_font([
-            "C:/Windows/Fonts/segoeui.ttf",
-            "C:/Windows/Fonts/calibri.ttf",
-            "C:/Windows/Fonts/arial.ttf"
-        ], int(height * 0.035))
-        
-        title, subtitle = split_location_for_title_subtitle(location_text)
-        
-        # PIN
-        pin_h = int(height * 0.07)
-        pin_r = int(pin_h * 0.38)
-        pin_cy = baseline_y - int(height * 0.13)
-        pin_cx = cx
-        
-        # Círculo externo
-        draw.ellipse([pin_cx-pin_r, pin_cy-pin_r, pin_cx+pin_r, pin_cy+pin_r], fill=WHITE)
-        
-        # Círculo interno (transparente)
-        inner_r = int(pin_r * 0.45)
-        draw.ellipse([pin_cx-inner_r, pin_cy-inner_r, pin_cx+inner_r, pin_cy+inner_r], fill=(0, 0, 0, 0))
-        
-        # Triângulo
-        tri_h = int(pin_h * 0.55)
-        tri_w = int(pin_r * 1.1)
-        draw.polygon([
-            (pin_cx, pin_cy+pin_r+tri_h),
-            (pin_cx-tri_w, pin_cy),
-            (pin_cx+tri_w, pin_cy)
-        ], fill=WHITE)
-        
-        # Linhas de destaque (azuis)
-        line_y = pin_cy + pin_r + int(tri_h * 0.35)
-        long_w = int(width * 0.08)
-        short_w = int(width * 0.05)
-        h_line = max(6, int(height * 0.003))
-        
-        draw.rectangle([cx-long_w//2, line_y, cx+long_w//2, line_y+h_line], fill=ACCENT)
-        line_y2 = line_y + int(h_line * 2.5)
-        draw.rectangle([cx-short_w//2, line_y2, cx+short_w//2, line_y2+h_line], fill=ACCENT)
-        
-        # Título
+        img.save(output_path, "PNG", compress_level=1)  # Asset temporário: encode rápido
+        return True
+    except Exception as e:
+        print(f"    ❌ Erro ao salvar PNG {os.path.basename(output_path)}: {e}")
+        return False
+
+def lower_third_cache_path(location_text: str, width: int, height: int) -> str:
+    """Caminho no cache do PNG para (endereço, resolução, parâmetros do render): mesmo conteúdo, mesmo arquivo.
+    
+    Cores, recorte (LOWER_THIRD_TOP_RATIO) e a versão do render entram na chave, então mudar
+    qualquer um deles gera PNGs novos em vez de reaproveitar um recorte que não bate com overlay_y.
+    """
+    render_params = f"v{LOWER_THIRD_RENDER_VERSION}|{ACCENT_COLOR}|{SUBTITLE_COLOR}|{LOWER_THIRD_TOP_RATIO}"
+    key = hashlib.blake2b(
+        f"{location_text}|{width}x{height}|{render_params}".encode('utf-8'), digest_size=8
+    ).hexdigest()
+    return os.path.join(PNG_CACHE_DIR, f"{key}.png")
+
+def link_png(cache_png: str, output_path: str, save_future: Optional[Future] = None) -> bool:
+    """Aguarda a gravação do PNG no cache (se pendente) e o liga em output_path (hardlink ou cópia)."""
+    if save_future is not None and not save_future.result():
+        return False
+    
+    try:
+        if os.path.exists(output_path):
+            os.remove(output_path)
         try:
-            draw.text((cx, baseline_y - int(height*0.03)), title, font=title_font, fill=WHITE, anchor="mm")
-        except TypeError:
-            tw, th = draw.textsize(title, font=title_font)
-            draw.text((cx - tw//2, baseline_y - int(height*0.03) - th//2), title, font=title_font, fill=WHITE)
-        
-        # Pill com subtítulo
-        if subtitle:
-            pad_x = int(width * 0.015)
-            pad_y = int(height * 0.008)
-            
-            try:
-                sw = int(subtitle_font.getlength(subtitle))
-                sh = subtitle_font.getbbox(subtitle)[3] - subtitle_font.getbbox(subtitle)[1]
-            except Exception:
-                sw, sh = draw.textsize(subtitle, font=subtitle_font)
-            
-            pill_w = sw + pad_x*2
-            pill_h = sh + pad_y*2
-            pill_r = pill_h // 2
-            
-            x1 = cx - pill_w//2
-            y1 = baseline_y + int(height * 0.025)
-            x2 = x1 + pill_w
-            y2 = y1 + pill_h
-            
-            draw.rounded_rectangle([x1, y1, x2, y2], radius=pill_r, fill=ACCENT)
-            
-            try:
-                draw.text((cx, y1 + pill_h//2), subtitle, font=subtitle_font, fill=TXT_SUB, anchor="mm")
-            except TypeError:
-                sww, shh = draw.textsize(subtitle, font=subtitle_font)
-                draw.text((cx - sww//2, y1 + (pill_h - shh)//2), subtitle, font=subtitle_font, fill=TXT_SUB)
-        
-        img.save(output_path, "PNG")
+            os.link(cache_png, output_path)
+        except OSError:
+            shutil.copyfile(cache_png, output_path)
         return True
+    except Exception as e:
+        print(f"    ❌ Erro ao copiar PNG do cache: {e}")
+        return False
+
+def render_lower_third(location_text: str, width: int, height: int) -> Image.Image:
+    """Desenha o lower third com pin (sem gravar).
+    
+    O canvas cobre só a faixa inferior do quadro (a partir de LOWER_THIRD_TOP_RATIO);
+    o overlay deve ser posicionado em y = lower_third_offset_y(height).
+    """
+    offset_y = lower_third_offset_y(height)
+    img = Image.new("RGBA", (width, height - offset_y), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    
+    WHITE = (255, 255, 255, 255)
+    ACCENT = ACCENT_COLOR
+    TXT_SUB = SUBTITLE_COLOR
+    
+    cx = width // 2
+    baseline_y = int(height * 0.82) - offset_y  # Relativo ao topo do canvas
+    
+    # Fontes
+    title_font = pick_font([
+        "C:/Windows/Fonts/arialbd.ttf",
+        "C:/Windows/Fonts/segoeuib.ttf",
+        "C:/Windows/Fonts/calibrib.ttf"
+    ], int(height * 0.055))
+    
+    subtitle_font = pick_font([
+        "C:/Windows/Fonts/segoeui.ttf",
+        "C:/Windows/Fonts/calibri.ttf",
+        "C:/Windows/Fonts/arial.ttf"
+    ], int(height * 0.035))
+    
+    title, subtitle = split_location_for_title_subtitle(location_text)
+    
+    # PIN
+    pin_h = int(height * 0.07)
+    pin_r = int(pin_h * 0.38)
+    pin_cy = baseline_y - int(height * 0.13)
+    pin_cx = cx
+    
+    # Anel do pin (círculo externo com miolo transparente) em uma única operação
+    inner_r = int(pin_r * 0.45)
+    draw.ellipse([pin_cx-pin_r, pin_cy-pin_r, pin_cx+pin_r, pin_cy+pin_r], outline=WHITE, width=max(1, pin_r - inner_r))
+    
+    # Triângulo
+    tri_h = int(pin_h * 0.55)
+    tri_w = int(pin_r * 1.1)
+    draw.polygon([
+        (pin_cx, pin_cy+pin_r+tri_h),
+        (pin_cx-tri_w, pin_cy),
+        (pin_cx+tri_w, pin_cy)
+    ], fill=WHITE)
+    
+    # Linhas de destaque (azuis)
+    line_y = pin_cy + pin_r + int(tri_h * 0.35)
+    long_w = int(width * 0.08)
+    short_w = int(width * 0.05)
+    h_line = max(6, int(height * 0.003))
+    
+    draw.rectangle([cx-long_w//2, line_y, cx+long_w//2, line_y+h_line], fill=ACCENT)
+    line_y2 = line_y + int(h_line * 2.5)
+    draw.rectangle([cx-short_w//2, line_y2, cx+short_w//2, line_y2+h_line], fill=ACCENT)
+    
+    # Título
+    draw.text((cx, baseline_y - int(height*0.03)), title, font=title_font, fill=WHITE, anchor="mm")
+    
+    # Pill com subtítulo
+    if subtitle:
+        pad_x = int(width * 0.015)
+        pad_y = int(height * 0.008)
+        
+        left, top, right, bottom = subtitle_font.getbbox(subtitle)
+        sw = right - left
+        sh = bottom - top
+        
+        pill_w = sw + pad_x*2
+        pill_h = sh + pad_y*2
+        pill_r = pill_h // 2
+        
+        x1 = cx - pill_w//2
+        y1 = baseline_y + int(height * 0.025)
+        x2 = x1 + pill_w
+        y2 = y1 + pill_h
+        
+        draw.rounded_rectangle([x1, y1, x2, y2], radius=pill_r, fill=ACCENT)
+        
+        draw.text((cx, y1 + pill_h//2), subtitle, font=subtitle_font, fill=TXT_SUB, anchor="mm")
+    
+    return img
+
+def create_lower_third_png(
+    location_text: str,
+    output_path: str,
+    width: int,
+    height: int,
+    pending_saves: Optional[List[Tuple[str, str, Optional[Future]]]] = None
+) -> bool:
+    """Cria PNG do lower third com pin.
+    
+    Cada (endereço, resolução) é renderizado uma única vez: o PNG fica em PNG_CACHE_DIR
+    e é ligado em output_path. Se pending_saves for fornecido, a gravação vai para
+    PNG_SAVE_POOL e (output_path, cache_png, future) é anexado à lista - quem chama
+    deve concluir cada item com link_png(cache_png, output_path, future).
+    """
+    try:
+        cache_png = lower_third_cache_path(location_text, width, height)
+        with PNG_CACHE_LOCK:
+            save_future = PNG_CACHE_SAVES.get(cache_png)
+            cached = save_future is not None or os.path.exists(cache_png)
+        
+        if not cached:
+            img = render_lower_third(location_text, width, height)
+            with PNG_CACHE_LOCK:
+                # Outra thread pode ter renderizado o mesmo PNG enquanto isso
+                save_future = PNG_CACHE_SAVES.get(cache_png)
+                if save_future is None:
+                    save_future = PNG_SAVE_POOL.submit(save_png, img, cache_png)
+                    PNG_CACHE_SAVES[cache_png] = save_future
+        
+        if pending_saves is not None:
+            pending_saves.append((output_path, cache_png, save_future))
+            return True
+        return link_png(cache_png, output_path, save_future)
         
     except Exception as e:
         print(f"    ❌ Erro ao criar PNG: {e}")
@@ -514,12 +727,22 @@ def create_lower_third_png(location_text: str, output_path: str, width: int, hei
 # FUNÇÃO PRINCIPAL
 # =============================================================================
 
-def process_video_location(video_path: str, video_name: str) -> Optional[Dict]:
-    """Processa localização de um vídeo e gera PNG do lower third."""
+def process_video_location(
+    video_path: str,
+    video_name: str,
+    run_ts: str,
+    geocode_cache: Optional[Dict[str, str]] = None,
+    ffprobe_cache: Optional[Dict[str, Dict]] = None,
+    pending_saves: Optional[List[Tuple[str, str, Optional[Future]]]] = None
+) -> Optional[Dict]:
+    """Processa localização de um vídeo e gera PNG do lower third.
+    
+    run_ts é o timestamp da execução (o mesmo do mapa de localizações) usado no nome do PNG.
+    """
     print(f"\n  🔍 Processando: {video_name}")
     
     # 1. Extrai GPS
-    metadata, error = run_ffprobe_gps(video_path)
+    metadata, error = run_ffprobe_gps(video_path, ffprobe_cache)
     if error:
         print(f"    ⚠️ {error}")
         return None
@@ -547,20 +770,19 @@ def process_video_location(video_path: str, video_name: str) -> Optional[Dict]:
     print(f"    🌍 GPS: {lat:.4f}, {lon:.4f}")
     
     # 3. Reverse geocoding
-    address = reverse_geocode(lat, lon)
+    address = reverse_geocode(lat, lon, geocode_cache)
     print(f"    🏠 Endereço: {address}")
     
-    # 4. Obtém dimensões do vídeo
-    width, height = get_video_dimensions(video_path)
+    # 4. Obtém dimensões do vídeo (mesmos metadados do passo 1, sem novo ffprobe)
+    width, height = get_video_dimensions_from_meta(metadata)
     print(f"    📐 Dimensões: {width}x{height}")
     
-    # 5. Gera PNG do lower third (com timestamp)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    png_filename = f"{timestamp}_lowerthird_{Path(video_name).stem}.png"
+    # 5. Gera PNG do lower third (com timestamp da execução)
+    png_filename = f"{run_ts}_lowerthird_{Path(video_name).stem}.png"
     png_path = os.path.join(OUTPUT_DIR, png_filename)
     
-    if create_lower_third_png(address, png_path, width, height):
-        print(f"    ✅ PNG criado: {png_filename}")
+    if create_lower_third_png(address, png_path, width, height, pending_saves):
+        print(f"    ✅ PNG gerado: {png_filename}")
     else:
         print("    ❌ Falha ao criar PNG")
         return None
@@ -573,6 +795,7 @@ def process_video_location(video_path: str, video_name: str) -> Optional[Dict]:
         "png_path": png_path,
         "width": width,
         "height": height,
+        "overlay_y": lower_third_offset_y(height),
         "timestamp": gps_data.get('timestamp', '')
     }
 
@@ -589,7 +812,7 @@ def main():
     print("⚡ SEM re-encodificação - apenas extração e criação de PNGs")
     
     # Mostra qual API está sendo usada
-    if USE_GOOGLE_MAPS and GOOGLE_MAPS_API_KEY and GOOGLEMAPS_AVAILABLE:
+    if GOOGLE_MAPS_CLIENT is not None:
         print("🗺️  Geocoding: Google Maps API ✅")
     else:
         print("🗺️  Geocoding: Nominatim (OpenStreetMap)")
@@ -605,13 +828,14 @@ def main():
         return
     
     os.makedirs(OUTPUT_DIR, exist_ok=True)
+    os.makedirs(PNG_CACHE_DIR, exist_ok=True)
     
-    # Lista vídeos
-    video_files = []
-    for ext in VIDEO_EXTENSIONS:
-        video_files.extend(glob.glob(os.path.join(SOURCES_DIR, ext)))
-    video_files = list(set(video_files))
-    video_files.sort()
+    # Lista vídeos (uma única leitura do diretório)
+    with os.scandir(SOURCES_DIR) as entries:
+        video_files = sorted(
+            entry.path for entry in entries
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in VIDEO_EXTENSIONS
+        )
     
     if not video_files:
         print(f"❌ Nenhum vídeo encontrado em '{SOURCES_DIR}'")
@@ -628,26 +852,59 @@ def main():
     # Processa cada vídeo
     locations_map = {}
     processed_count = 0
+    geocode_cache = load_geocode_cache()
+    cached_addresses = len(geocode_cache)
+    ffprobe_cache = load_ffprobe_cache()
+    cached_probes = len(ffprobe_cache)
+    
+    print(f"🔄 Processando vídeos ({MAX_WORKERS} em paralelo)...")
+    
+    # ffprobe, geocoding e PNG são I/O-bound: threads sobrepõem as esperas
+    # (os rate limiters continuam valendo entre as threads)
+    results = {}
+    pending_saves = []
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {
+            executor.submit(
+                process_video_location, video_path, os.path.basename(video_path), timestamp,
+                geocode_cache, ffprobe_cache, pending_saves
+            ): video_path
+            for video_path in video_files
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            video_name = os.path.basename(futures[future])
+            print(f"\n[{done}/{len(video_files)}] {video_name} concluído")
+            results[video_name] = future.result()
+    
+    # Aguarda os PNGs ainda em gravação (o mapa só pode apontar para arquivos prontos)
+    failed_pngs = {
+        png_path for png_path, cache_png, future in pending_saves
+        if not link_png(cache_png, png_path, future)
+    }
+    PNG_SAVE_POOL.shutdown(wait=True)
     
-    print("🔄 Processando vídeos...")
-    
-    for i, video_path in enumerate(video_files, 1):
+    # Mantém a ordem original dos vídeos no mapa
+    for video_path in video_files:
         video_name = os.path.basename(video_path)
-        print(f"\n[{i}/{len(video_files)}] {video_name}")
-        
-        location_data = process_video_location(video_path, video_name)
-        
-        if location_data:
+        location_data = results.get(video_name)
+        if location_data and location_data['png_path'] not in failed_pngs:
             locations_map[video_name] = location_data
             processed_count += 1
     
+    # Salva caches se houve novas consultas
+    if len(geocode_cache) != cached_addresses or len(ffprobe_cache) != cached_probes:
+        print()
+    if len(geocode_cache) != cached_addresses:
+        save_geocode_cache(geocode_cache)
+    if len(ffprobe_cache) != cached_probes:
+        save_ffprobe_cache(ffprobe_cache)
+    
     # Salva mapa de localizações
     print("\n" + "=" * 70)
     print(f"💾 Salvando mapa de localizações...")
     
     try:
-        with open(locations_map_file, 'w', encoding='utf-8') as f:
-            json.dump(locations_map, f, indent=2, ensure_ascii=False)
+        write_json(locations_map_file, locations_map)
         print(f"✅ Mapa salvo: {locations_map_file}")
     except Exception as e:
         print(f"❌ Erro ao salvar mapa: {e}")
@@ -7,15 +7,27 @@ Etapa 2: Transcrição via OpenAI API + análise + geração de teaser sequencia
 import os
 import subprocess
 import json
-import tempfile
 import requests
-from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, timedelta
 import time
 import re
+import hashlib
+import difflib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Importar apenas a API key do arquivo externo
 from config import OPENAI_API_KEY
+from pipeline_utils import escape_concat_path, file_cache_key, parse_selected_ids, run_ffmpeg, write_json
+
+# PyAV é opcional (lê o container em processo, sem subprocess); sem ele usa ffprobe
+try:
+    import av
+    AV_AVAILABLE = True
+except ImportError:
+    AV_AVAILABLE = False
 
 # =============================================================================
 # CONFIGURAÇÕES - ALTERE AQUI CONFORME NECESSÁRIO
@@ -37,11 +49,20 @@ MIN_CLIP_DURATION = 5.0        # Duração mínima de cada clipe (segundos)
 MAX_CLIP_DURATION = 8.0        # Duração máxima de cada clipe (segundos)
 MIN_GAP_BETWEEN_CLIPS = 5.0    # Gap mínimo entre clipes (segundos)
 CLIP_OFFSET = 1.0     # Offset de 1 segundo entre clipes para evitar travamentos
+DUPLICATE_TEXT_RATIO = 0.9     # Segmentos consecutivos com texto ao menos tão similar são enviados uma vez ao GPT
+PROMPT_TEXT_CHARS = 80         # Caracteres de cada segmento enviados no prompt
 
 # Configurações de debug
 CLEANUP_TEMP_FILES = True  # Manter arquivos temporários para análise
 SKIP_TRANSCRIPTION_IF_EXISTS = True  # Pular transcrição se já existir arquivo temporário
+DEBUG_CLIP_PROPS = False  # Rodar ffprobe em cada clipe antes da mesclagem (só para debug)
 CHUNK_DURATION_MINUTES = 10  # Duração de cada chunk em minutos para evitar timeout
+MAX_PARALLEL_CHUNKS = 6  # Chunks processados em paralelo (extração de áudio + transcrição)
+MAX_CONCURRENT_API_CALLS = 4  # Limite de chamadas simultâneas à API Whisper (rate limit)
+MAX_PARALLEL_CLIPS = min(os.cpu_count() or 1, 8)  # Clipes extraídos em paralelo (-c copy é limitado por I/O)
+
+# Cache de durações do ffprobe (chave: caminho + mtime + tamanho)
+DURATION_CACHE_FILE = os.path.join(OUTPUT_DIR, "duration_cache.json")
 
 # Configurações de análise de texto - DINÂMICAS
 # As keywords serão geradas dinamicamente pelo GPT-4o-mini baseadas no conteúdo
@@ -57,6 +78,21 @@ AUDIO_BITRATE = '128k'
 
 # =============================================================================
 
+# Sessão HTTP compartilhada entre threads (reaproveita conexões TCP/TLS com a API)
+OPENAI_SESSION = requests.Session()
+OPENAI_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=MAX_PARALLEL_CHUNKS,
+    # POST incluso: o corpo (áudio/prompt) está em memória e pode ser reenviado
+    max_retries=Retry(
+        total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset(['POST'])
+    )
+))
+
+# Limita chamadas simultâneas ao Whisper independentemente da extração de áudio
+WHISPER_SEMAPHORE = threading.Semaphore(MAX_CONCURRENT_API_CALLS)
+
 def validate_config():
     """Valida as configurações do programa"""
     if not os.path.exists(INPUT_DIR):
@@ -87,39 +123,95 @@ def validate_config():
 
 def find_latest_video():
     """Encontra o vídeo mais recente na pasta output"""
-    # Buscar especificamente por arquivos concatenated_videos.mp4
-    video_files = []
-    for pattern in ['*concatenated_videos.mp4', '*concatenated_videos.MP4']:
-        video_files.extend(Path(INPUT_DIR).glob(pattern))
+    # Uma única varredura: guarda o mais recente concatenado e o mais recente .mp4 (fallback)
+    latest_concat = latest_any = None
+    with os.scandir(INPUT_DIR) as entries:
+        for entry in entries:
+            name = entry.name.lower()
+            if not name.endswith('.mp4') or not entry.is_file():
+                continue
+            mtime = entry.stat().st_mtime
+            if latest_any is None or mtime > latest_any[0]:
+                latest_any = (mtime, entry)
+            if name.endswith('concatenated_videos.mp4') and (latest_concat is None or mtime > latest_concat[0]):
+                latest_concat = (mtime, entry)
     
-    if not video_files:
+    if latest_concat is None:
         print(f"❌ Nenhum vídeo concatenado encontrado na pasta '{INPUT_DIR}'")
         # Fallback para qualquer vídeo mp4
-        for ext in ['*.mp4', '*.MP4']:
-            video_files.extend(Path(INPUT_DIR).glob(ext))
-        
-        if not video_files:
+        if latest_any is None:
             print(f"❌ Nenhum vídeo encontrado na pasta '{INPUT_DIR}'")
             return None
     
-    # Ordenar por data de modificação (mais recente primeiro)
-    latest_video = max(video_files, key=lambda x: x.stat().st_mtime)
+    latest_video = (latest_concat or latest_any)[1]
     print(f"    📁 Arquivo selecionado: {latest_video.name}")
-    return str(latest_video)
+    return latest_video.path
 
-def get_video_duration(video_path):
-    """Obtém a duração de um vídeo usando ffprobe"""
-    cmd = [
-        'ffprobe',
-        '-v', 'quiet',
-        '-show_entries', 'format=duration',
-        '-of', 'csv=p=0',
-        video_path
-    ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
+def probe_duration_av(video_path):
+    """Lê a duração do container com PyAV (None se não for possível)"""
+    try:
+        with av.open(video_path) as container:
+            if container.duration is None:
+                return None
+            return container.duration / av.time_base
+    except Exception:
         return None
-    return float(result.stdout.strip())
+
+def describe_clip_av(clip_file):
+    """Descreve vídeo/áudio de um clipe com PyAV (None se não for possível)"""
+    try:
+        with av.open(clip_file) as container:
+            video = next((s for s in container.streams if s.type == 'video'), None)
+            audio = next((s for s in container.streams if s.type == 'audio'), None)
+            if not (video and audio):
+                return None
+            return (f"{video.codec_context.name} {video.codec_context.width}x{video.codec_context.height} @{video.average_rate}"
+                    f" | {audio.codec_context.name} @{audio.codec_context.sample_rate}")
+    except Exception:
+        return None
+
+def load_duration_cache():
+    """Carrega cache de durações se existir"""
+    if os.path.exists(DURATION_CACHE_FILE):
+        try:
+            with open(DURATION_CACHE_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"      ⚠️ Erro ao carregar cache de durações: {e}")
+    return {}
+
+def save_duration_cache(duration_cache):
+    """Salva cache de durações"""
+    try:
+        with open(DURATION_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(duration_cache, f, ensure_ascii=False, indent=2)
+    except Exception as e:
+        print(f"      ⚠️ Erro ao salvar cache de durações: {e}")
+
+def get_video_duration(video_path):
+    """Obtém a duração de um vídeo usando ffprobe (consulta o cache em disco primeiro)"""
+    duration_cache = load_duration_cache()
+    key = file_cache_key(video_path)
+    if key in duration_cache:
+        return duration_cache[key]
+    
+    duration = probe_duration_av(video_path) if AV_AVAILABLE else None
+    if duration is None:
+        cmd = [
+            'ffprobe',
+            '-v', 'quiet',
+            '-show_entries', 'format=duration',
+            '-of', 'csv=p=0',
+            video_path
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            return None
+        duration = float(result.stdout.strip())
+    
+    duration_cache[key] = duration
+    save_duration_cache(duration_cache)
+    return duration
 
 def get_transcript_cache_path(video_path):
     """Gera caminho do cache de transcrição baseado no vídeo"""
@@ -139,79 +231,54 @@ def load_cached_transcript(cache_path):
 def save_transcript_cache(transcript_data, cache_path):
     """Salva transcrição no cache"""
     try:
-        with open(cache_path, 'w', encoding='utf-8') as f:
-            json.dump(transcript_data, f, ensure_ascii=False, indent=2)
+        write_json(cache_path, transcript_data)
         print(f"      💾 Transcrição salva em cache: {os.path.basename(cache_path)}")
     except Exception as e:
         print(f"      ⚠️ Erro ao salvar cache: {e}")
 
-def split_video_into_chunks(video_path, chunk_duration_minutes):
-    """Divide vídeo em chunks para evitar timeout da API"""
-    print(f"    ✂️ Dividindo vídeo em chunks de {chunk_duration_minutes} minutos...")
-    
-    video_duration = get_video_duration(video_path)
-    if not video_duration:
-        return []
-    
+def get_chunk_ranges(video_duration, chunk_duration_minutes):
+    """Divide a duração do vídeo em intervalos (chunks) para evitar timeout da API"""
     chunk_duration_seconds = chunk_duration_minutes * 60
-    chunks = []
-    
-    for i, start_time in enumerate(range(0, int(video_duration), chunk_duration_seconds)):
-        end_time = min(start_time + chunk_duration_seconds, video_duration)
-        
-        chunk_path = os.path.join(OUTPUT_DIR, f"chunk_{i+1:02d}_{start_time:.0f}s-{end_time:.0f}s.mp4")
-        
-        cmd = [
-            'ffmpeg', '-y',
-            '-ss', str(start_time),
-            '-i', video_path,
-            '-t', str(end_time - start_time),
-            '-c', 'copy',
-            chunk_path
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0:
-            chunks.append({
-                'path': chunk_path,
-                'start': start_time,
-                'end': end_time,
-                'index': i + 1
-            })
-            print(f"      ✅ Chunk {i+1}: {start_time:.0f}s - {end_time:.0f}s")
-        else:
-            print(f"      ❌ Erro no chunk {i+1}: {result.stderr}")
-    
-    return chunks
+    return [
+        {
+            'start': start_time,
+            'end': min(start_time + chunk_duration_seconds, video_duration),
+            'index': i
+        }
+        for i, start_time in enumerate(range(0, int(video_duration), chunk_duration_seconds), 1)
+    ]
 
-def extract_audio_for_api(video_path):
-    """Extrai áudio otimizado para API OpenAI"""
-    print("    🔊 Extraindo áudio para API OpenAI...")
+def extract_audio_for_api(video_path, start_time=None, duration=None):
+    """Extrai áudio otimizado para API OpenAI direto para memória (sem arquivos temporários)
     
-    with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as temp_audio:
-        audio_path = temp_audio.name
+    Com start_time/duration extrai só o trecho do chunk, lendo o vídeo original.
+    """
+    print("    🔊 Extraindo áudio para API OpenAI...")
     
-    # Extrair áudio otimizado para API
-    cmd_extract = [
-        'ffmpeg', '-y',
-        '-i', video_path,
+    cmd_extract = ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error', '-nostats', '-threads', '0']  # Só erros no stderr; decodificação multi-thread
+    if start_time is not None:
+        cmd_extract += ['-ss', str(start_time)]
+    cmd_extract += ['-i', video_path]
+    if duration is not None:
+        cmd_extract += ['-t', str(duration)]
+    cmd_extract += [
         '-vn',  # Sem vídeo
         '-acodec', 'mp3',  # Codec MP3 para API
         '-ar', '16000',  # Sample rate 16kHz
         '-ac', '1',  # Mono
         '-b:a', '64k',  # Bitrate baixo para API
-        audio_path
+        '-f', 'mp3', 'pipe:1'  # MP3 pelo stdout
     ]
     
-    result = subprocess.run(cmd_extract, capture_output=True, text=True)
-    if result.returncode != 0:
-        print(f"      ❌ Erro ao extrair áudio: {result.stderr}")
+    result = subprocess.run(cmd_extract, capture_output=True)
+    if result.returncode != 0 or not result.stdout:
+        print(f"      ❌ Erro ao extrair áudio: {result.stderr.decode('utf-8', errors='replace')}")
         return None
     
-    return audio_path
+    return result.stdout
 
-def transcribe_with_openai_api(audio_path):
-    """Transcreve áudio usando API OpenAI Whisper"""
+def transcribe_with_openai_api(audio_data, filename="audio.mp3"):
+    """Transcreve áudio (bytes MP3) usando API OpenAI Whisper"""
     print("    🤖 Transcrevendo com OpenAI Whisper API...")
     
     url = "https://api.openai.com/v1/audio/transcriptions"
@@ -219,56 +286,97 @@ def transcribe_with_openai_api(audio_path):
         "Authorization": f"Bearer {OPENAI_API_KEY}"
     }
     
-    with open(audio_path, 'rb') as audio_file:
-        files = {
-            'file': (audio_path, audio_file, 'audio/mpeg'),
-            'model': (None, OPENAI_WHISPER_MODEL),
-            'language': (None, LANGUAGE),
-            'response_format': (None, 'verbose_json'),
-            'timestamp_granularities': (None, 'segment')
-        }
+    files = {
+        'file': (filename, audio_data, 'audio/mpeg'),
+        'model': (None, OPENAI_WHISPER_MODEL),
+        'language': (None, LANGUAGE),
+        'response_format': (None, 'verbose_json'),
+        'timestamp_granularities': (None, 'segment')
+    }
+    
+    try:
+        with WHISPER_SEMAPHORE:
+            response = OPENAI_SESSION.post(url, headers=headers, files=files, timeout=300)
+        response.raise_for_status()
         
+        transcript_data = response.json()
+        print(f"      ✅ Transcrição concluída via API")
+        return transcript_data
+        
+    except requests.exceptions.RequestException as e:
+        print(f"      ❌ Erro na API: {e}")
+        return None
+
+def get_selection_cache_path(request_data):
+    """Gera caminho do cache da seleção do GPT a partir do hash da requisição"""
+    request_json = json.dumps(request_data, sort_keys=True, ensure_ascii=False)
+    request_hash = hashlib.sha1(request_json.encode('utf-8')).hexdigest()
+    return os.path.join(OUTPUT_DIR, f"gpt_select_{request_hash}.json")
+
+def load_cached_selection(cache_path):
+    """Carrega resposta do GPT (IDs selecionados) do cache se existir"""
+    if os.path.exists(cache_path):
         try:
-            response = requests.post(url, headers=headers, files=files, timeout=300)
-            response.raise_for_status()
-            
-            transcript_data = response.json()
-            print(f"      ✅ Transcrição concluída via API")
-            return transcript_data
-            
-        except requests.exceptions.RequestException as e:
-            print(f"      ❌ Erro na API: {e}")
-            return None
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)['response_content']
+        except Exception as e:
+            print(f"      ⚠️ Erro ao carregar cache do GPT: {e}")
+    return None
+
+def save_selection_cache(selected_indices, cache_path):
+    """Salva resposta do GPT (IDs selecionados) no cache"""
+    try:
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump({"response_content": selected_indices}, f, ensure_ascii=False, indent=2)
+    except Exception as e:
+        print(f"      ⚠️ Erro ao salvar cache do GPT: {e}")
+
+def pick_evenly_spaced(items, count):
+    """Seleciona até count itens uniformemente espaçados da lista (mantendo a ordem)"""
+    if len(items) <= count:
+        return list(items)
+    step = len(items) / count
+    return [items[int(k * step)] for k in range(count)]
 
 def generate_teaser_segments(segments):
     """Gera segmentos para teaser narrativo usando GPT-4o-mini - OTIMIZADO COM IDs"""
     print("    🧠 Analisando conteúdo e criando teaser narrativo...")
     
+    # Limites temporais calculados uma única vez (segmentos do Whisper já vêm em ordem)
+    video_duration = segments[-1]['end']
+    inicio_cut = video_duration * 0.2
+    meio_lo = video_duration * 0.3
+    meio_hi = video_duration * 0.7
+    fim_cut = video_duration * 0.8
+    
     url = "https://api.openai.com/v1/chat/completions"
     headers = {
         "Authorization": f"Bearer {OPENAI_API_KEY}",
         "Content-Type": "application/json"
     }
     
-    # OTIMIZAÇÃO: Criar JSON simplificado com apenas dados essenciais
+    # OTIMIZAÇÃO: Criar JSON simplificado com apenas dados essenciais (texto já truncado)
+    # e colapsar repetições consecutivas (ex: alucinações do Whisper) - os IDs continuam
+    # sendo os índices originais, então o mapeamento de volta não muda
     simplified_segments = []
     for i, seg in enumerate(segments):
+        text = seg['text'].strip()[:PROMPT_TEXT_CHARS]
+        if simplified_segments and difflib.SequenceMatcher(None, text, simplified_segments[-1]['text']).ratio() >= DUPLICATE_TEXT_RATIO:
+            continue
         simplified_segments.append({
             "id": i,
             "start": seg['start'],
             "end": seg['end'],
-            "text": seg['text'].strip()
+            "text": text
         })
     
-    # Usar todos os segmentos disponíveis
-    total_segments = len(simplified_segments)
+    # Criar contexto com todos os segmentos distintos
+    segments_context = "".join(
+        f"ID {seg['id']}: {seg['start']:.1f}s-{seg['end']:.1f}s - {seg['text']}...\n"
+        for seg in simplified_segments
+    )
     
-    # Criar contexto com TODOS os segmentos (sem limitação)
-    segments_context = ""
-    for i, seg in enumerate(simplified_segments):
-        segments_context += f"ID {seg['id']}: {seg['start']:.1f}s-{seg['end']:.1f}s - {seg['text'][:80]}...\n"
-    
-    print(f"      📝 Enviando TODOS os {len(simplified_segments)} segmentos para GPT")
+    print(f"      📝 Enviando {len(simplified_segments)} segmentos para GPT ({len(segments) - len(simplified_segments)} repetidos omitidos)")
     
     prompt = f"""
         #AÇÃO:
@@ -301,133 +409,128 @@ def generate_teaser_segments(segments):
         "temperature": 0.1
     }
     
+    # Mesma requisição (prompt com segmentos e parâmetros + modelo) = mesma seleção
+    selection_cache_path = get_selection_cache_path(data)
+    
     # Salvar JSON enviado para debug
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     debug_file = os.path.join(OUTPUT_DIR, f"{timestamp}_gpt_request_debug.json")
     
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=60)
-        response.raise_for_status()
-        
-        result = response.json()
-        selected_indices = result['choices'][0]['message']['content'].strip()
+        selected_indices = load_cached_selection(selection_cache_path)
+        if selected_indices is not None:
+            print(f"      💾 Usando seleção do GPT em cache: {os.path.basename(selection_cache_path)}")
+        else:
+            response = OPENAI_SESSION.post(url, headers=headers, json=data, timeout=60)
+            response.raise_for_status()
+            
+            result = response.json()
+            selected_indices = result['choices'][0]['message']['content'].strip()
+            save_selection_cache(selected_indices, selection_cache_path)
         
-        # Salvar debug com a resposta do GPT
+        # Salvar debug com a resposta do GPT (também com cache: a etapa 2b lê o debug mais recente)
         try:
-            with open(debug_file, 'w', encoding='utf-8') as f:
-                json.dump({
-                    "timestamp": timestamp,
-                    "total_segments": len(simplified_segments),
-                    "prompt": prompt,
-                    "request_data": data,
-                    "response_content": selected_indices  # ← ADICIONADO!
-                }, f, ensure_ascii=False, indent=2)
+            write_json(debug_file, {
+                "timestamp": timestamp,
+                "total_segments": len(segments),
+                "prompt_segments": len(simplified_segments),
+                "model": OPENAI_GPT_MODEL,
+                "prompt": prompt,
+                "response_content": selected_indices  # ← ADICIONADO!
+            })
             print(f"      💾 Debug JSON salvo: {os.path.basename(debug_file)}")
         except Exception as e:
             print(f"      ⚠️ Erro ao salvar debug JSON: {e}")
         
         # Processar resposta do GPT - mapear IDs de volta para segments
-        selected_ids = [int(id_str.strip()) for id_str in selected_indices.split(',') if id_str.strip().isdigit()]
+        # (dicionário por ID: cada inclusão já descarta duplicatas, mantendo a ordem)
+        selected_ids = parse_selected_ids(selected_indices)
         print(f"      🔍 DEBUG: IDs selecionados pelo GPT: {len(selected_ids)}")
         
+        # Mapear IDs de volta para segments (mapeamento direto e preciso)
+        selected_by_id = {}
+        for selected_id in selected_ids:
+            if 0 <= selected_id < len(segments):
+                selected_by_id.setdefault(selected_id, segments[selected_id])
+                print(f"      ✅ Mapeado ID {selected_id}: {segments[selected_id]['start']:.1f}s-{segments[selected_id]['end']:.1f}s - {segments[selected_id]['text'][:50]}...")
+            else:
+                print(f"      ⚠️ ID inválido: {selected_id}")
+        
         # Verificar se selecionou quantidade adequada
-        if len(selected_ids) < 8:
-            print(f"      ⚠️ GPT selecionou apenas {len(selected_ids)} segmentos, completando...")
+        if len(selected_by_id) < 8:
+            print(f"      ⚠️ GPT selecionou apenas {len(selected_by_id)} segmentos, completando...")
             
             # Adicionar segmentos do meio e fim se necessário
-            all_valid_ids = set(selected_ids)
-            remaining_needed = 12 - len(selected_ids)  # Completar até 12 segmentos
+            remaining_needed = 12 - len(selected_by_id)  # Completar até 12 segmentos
             
             # Buscar segmentos do meio (30-70% do vídeo)
             meio_start_idx = len(segments) // 3
             meio_end_idx = 2 * len(segments) // 3
-            meio_candidates = [i for i in range(meio_start_idx, meio_end_idx) if i not in all_valid_ids]
+            meio_candidates = [i for i in range(meio_start_idx, meio_end_idx) if i not in selected_by_id]
             
             # Buscar segmentos do fim (últimos 30%)
             fim_start_idx = int(len(segments) * 0.7)
-            fim_candidates = [i for i in range(fim_start_idx, len(segments)) if i not in all_valid_ids]
+            fim_candidates = [i for i in range(fim_start_idx, len(segments)) if i not in selected_by_id]
             
             # Adicionar candidatos alternativos
             additional_candidates = meio_candidates[:remaining_needed//2] + fim_candidates[:remaining_needed//2]
             if len(additional_candidates) < remaining_needed:
                 # Se ainda não tem o suficiente, pegar qualquer segmento válido
-                all_candidates = [i for i in range(len(segments)) if i not in all_valid_ids]
+                all_candidates = [i for i in range(len(segments)) if i not in selected_by_id and i not in additional_candidates]
                 additional_candidates.extend(all_candidates[:remaining_needed - len(additional_candidates)])
             
-            selected_ids.extend(additional_candidates[:remaining_needed])
+            for i in additional_candidates[:remaining_needed]:
+                selected_by_id.setdefault(i, segments[i])
             print(f"      ✅ Completado com {len(additional_candidates[:remaining_needed])} segmentos adicionais")
         
-        # Mapear IDs de volta para segments (mapeamento direto e preciso)
-        selected_segments = []
-        for selected_id in selected_ids:
-            if 0 <= selected_id < len(segments):
-                selected_segments.append(segments[selected_id])
-                print(f"      ✅ Mapeado ID {selected_id}: {segments[selected_id]['start']:.1f}s-{segments[selected_id]['end']:.1f}s - {segments[selected_id]['text'][:50]}...")
-            else:
-                print(f"      ⚠️ ID inválido: {selected_id}")
-        
         # Verificar distribuição temporal
-        if selected_segments:
-            timestamps = [seg['start'] for seg in selected_segments]
-            max_timestamp = max(timestamps)
-            video_duration = max([seg['end'] for seg in segments])
+        if selected_by_id:
+            max_timestamp = max(seg['start'] for seg in selected_by_id.values())
             
             print(f"      🔍 DEBUG: Timestamp máximo: {max_timestamp:.1f}s de {video_duration:.1f}s total")
             
             # Se ainda está concentrado no início, forçar distribuição
-            if max_timestamp < (video_duration * 0.3):
+            if max_timestamp < meio_lo:
                 print(f"      ⚠️ Ainda concentrado no início - forçando distribuição...")
                 
                 # Manter alguns do início e adicionar do meio/fim
-                inicio_segments = [seg for seg in selected_segments if seg['start'] < video_duration * 0.2]
-                selected_segments = inicio_segments[:2]  # Manter apenas 2 do início
-                
-                # Adicionar do meio
-                meio_segments = [seg for seg in segments if video_duration * 0.3 < seg['start'] < video_duration * 0.7]
-                if meio_segments:
-                    selected_segments.extend(meio_segments[::len(meio_segments)//3])  # 3 do meio
+                inicio_ids = [i for i, seg in selected_by_id.items() if seg['start'] < inicio_cut]
+                selected_by_id = {i: selected_by_id[i] for i in inicio_ids[:2]}  # Manter apenas 2 do início
                 
-                # Adicionar do fim
-                fim_segments = [seg for seg in segments if seg['start'] > video_duration * 0.8]
-                if fim_segments:
-                    selected_segments.extend(fim_segments[::len(fim_segments)//2])  # 2 do fim
+                # Separar meio e fim em uma única passada
+                meio_ids = []
+                fim_ids = []
+                for i, seg in enumerate(segments):
+                    if meio_lo < seg['start'] < meio_hi:
+                        meio_ids.append(i)
+                    elif seg['start'] > fim_cut:
+                        fim_ids.append(i)
                 
-                # Remover duplicatas e ordenar
-                selected_segments = list({seg['start']: seg for seg in selected_segments}.values())
-                selected_segments.sort(key=lambda x: x['start'])
+                # Adicionar do meio e do fim, uniformemente espaçados
+                for i in pick_evenly_spaced(meio_ids, 3) + pick_evenly_spaced(fim_ids, 2):  # 3 do meio, 2 do fim
+                    selected_by_id.setdefault(i, segments[i])
                 
-                print(f"      ✅ Distribuição forçada: {len(selected_segments)} segmentos")
-                if selected_segments:
-                    timestamps = [seg['start'] for seg in selected_segments]
+                print(f"      ✅ Distribuição forçada: {len(selected_by_id)} segmentos")
+                if selected_by_id:
+                    timestamps = [seg['start'] for seg in selected_by_id.values()]
                     print(f"      📊 Timestamps: {min(timestamps):.1f}s - {max(timestamps):.1f}s")
         
+        selected_segments = sorted(selected_by_id.values(), key=lambda x: x['start'])
+        
         # Aplicar filtro anti-sobreposição baseado na duração desejada
+        # (varredura única em ordem cronológica: só o último clipe aceito importa)
         filtered_segments = []
         min_gap = MIN_GAP_BETWEEN_CLIPS
         max_segments = int(TARGET_TEASER_DURATION / MIN_CLIP_DURATION)  # Máximo baseado na duração desejada
+        last_end = float('-inf')
         
         for segment in selected_segments:
-            if not filtered_segments:
+            # Rejeita sobreposição ou gap muito pequeno em relação ao anterior
+            if segment['start'] >= last_end + min_gap:
                 filtered_segments.append(segment)
-            else:
-                # Verificar se há sobreposição ou gap muito pequeno
-                has_overlap = False
-                for selected in filtered_segments:
-                    if (segment['start'] < selected['end'] and segment['end'] > selected['start']):
-                        has_overlap = True
-                        break
-                    gap = min(abs(segment['start'] - selected['end']), abs(selected['start'] - segment['end']))
-                    if gap < min_gap:
-                        has_overlap = True
-                        break
-                
-                if not has_overlap:
-                    filtered_segments.append(segment)
-                    if len(filtered_segments) >= max_segments:
-                        break
-        
-        # Ordenar por timestamp para manter ordem sequencial
-        filtered_segments.sort(key=lambda x: x['start'])
+                last_end = segment['end']
+                if len(filtered_segments) >= max_segments:
+                    break
         
         print(f"      ✅ {len(filtered_segments)} segmentos selecionados para teaser narrativo")
         print(f"      📝 Duração total: {sum(seg['end'] - seg['start'] for seg in filtered_segments):.1f}s")
@@ -447,6 +550,30 @@ def generate_teaser_segments(segments):
         # Fallback: retornar primeiros 8 segmentos
         return segments[:8]
 
+def transcribe_chunk(video_path, chunk, total_chunks):
+    """Extrai áudio e transcreve um chunk, retornando (índice, segmentos com timestamps ajustados, texto)"""
+    print(f"    🎯 Processando chunk {chunk['index']}/{total_chunks}...")
+    
+    segments = []
+    text = ""
+    
+    # Extrair áudio do trecho direto do vídeo original
+    audio_data = extract_audio_for_api(video_path, chunk['start'], chunk['end'] - chunk['start'])
+    if audio_data:
+        # Transcrever chunk
+        chunk_data = transcribe_with_openai_api(audio_data, f"chunk_{chunk['index']:02d}.mp3")
+        
+        if chunk_data and 'segments' in chunk_data:
+            # Ajustar timestamps dos segmentos para o vídeo original
+            for segment in chunk_data['segments']:
+                segment['start'] += chunk['start']
+                segment['end'] += chunk['start']
+                segments.append(segment)
+            
+            text = chunk_data.get('text', '')
+    
+    return chunk['index'], segments, text
+
 def transcribe_video_api(video_path):
     """Transcreve o vídeo usando API OpenAI com chunks e cache - ULTRA RÁPIDO"""
     print("🎤 Passo 1/4: TRANSCREVENDO vídeo com OpenAI API...")
@@ -477,43 +604,25 @@ def transcribe_video_api(video_path):
     if use_chunks:
         print(f"    🔄 Vídeo longo detectado - usando chunks de {CHUNK_DURATION_MINUTES} minutos")
         
-        # Dividir em chunks
-        chunks = split_video_into_chunks(video_path, CHUNK_DURATION_MINUTES)
-        if not chunks:
-            print("    ❌ Erro ao dividir vídeo em chunks")
-            return None
+        # Dividir em chunks (só intervalos - o áudio de cada um é extraído direto do original)
+        chunks = get_chunk_ranges(video_duration, CHUNK_DURATION_MINUTES)
         
-        # Transcrever cada chunk
+        # Transcrever chunks em paralelo (cada um é dominado pela latência da API)
+        results = {}
+        with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_CHUNKS, len(chunks))) as executor:
+            futures = [executor.submit(transcribe_chunk, video_path, chunk, len(chunks)) for chunk in chunks]
+            for future in as_completed(futures):
+                index, segments, text = future.result()
+                results[index] = (segments, text)
+        
+        # Juntar na ordem dos chunks
         all_segments = []
         full_text = ""
-        
-        for chunk in chunks:
-            print(f"    🎯 Processando chunk {chunk['index']}/{len(chunks)}...")
-            
-            # Extrair áudio do chunk
-            audio_path = extract_audio_for_api(chunk['path'])
-            if not audio_path:
-                continue
-            
-            # Transcrever chunk
-            chunk_data = transcribe_with_openai_api(audio_path)
-            
-            # Cleanup áudio temporário
-            if os.path.exists(audio_path):
-                os.remove(audio_path)
-            
-            if chunk_data and 'segments' in chunk_data:
-                # Ajustar timestamps dos segmentos para o vídeo original
-                for segment in chunk_data['segments']:
-                    segment['start'] += chunk['start']
-                    segment['end'] += chunk['start']
-                    all_segments.append(segment)
-                
-                full_text += chunk_data.get('text', '') + " "
-            
-            # Cleanup chunk temporário
-            if os.path.exists(chunk['path']):
-                os.remove(chunk['path'])
+        for index in sorted(results):
+            segments, text = results[index]
+            all_segments.extend(segments)
+            if segments:
+                full_text += text + " "
         
         # Combinar resultados
         transcript_data = {
@@ -527,16 +636,12 @@ def transcribe_video_api(video_path):
         print("    🎯 Processando vídeo completo...")
         
         # Extrair áudio para API
-        audio_path = extract_audio_for_api(video_path)
-        if not audio_path:
+        audio_data = extract_audio_for_api(video_path)
+        if not audio_data:
             return None
         
         # Transcrever com API OpenAI
-        transcript_data = transcribe_with_openai_api(audio_path)
-        
-        # Cleanup
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
+        transcript_data = transcribe_with_openai_api(audio_data)
     
     if not transcript_data:
         return None
@@ -616,6 +721,10 @@ def extract_clips_with_offset(video_path, segments):
     
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     clip_files = []
+    jobs = []
+    
+    # Timestamp único da extração (nomes consistentes, mesmo com clipes no mesmo segundo)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
     for i, segment in enumerate(segments, 1):
         start_time = segment['start']
@@ -635,12 +744,13 @@ def extract_clips_with_offset(video_path, segments):
             duration = MAX_CLIP_DURATION
         
         # Nome do clipe com timestamp no formato do teaser
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         clip_file = os.path.join(OUTPUT_DIR, f"{timestamp}_clip_{i:02d}_{start_time:.1f}s-{end_time:.1f}s.mp4")
         
         # Cortar exatamente onde o Whisper indicou - SIMPLES E DIRETO
         cmd = [
             'ffmpeg', '-y',
+            '-hide_banner', '-loglevel', 'error', '-nostats',  # stderr só com erros
+            '-fflags', '+genpts',  # Regenera PTS ausentes na cópia
             '-ss', str(start_time),  # Início exato da fala
             '-i', video_path,  # Input DEPOIS do -ss para precisão
             '-t', str(end_time - start_time),  # Duração exata da fala
@@ -648,9 +758,14 @@ def extract_clips_with_offset(video_path, segments):
             '-avoid_negative_ts', 'make_zero',  # Evitar problemas de timestamp
             clip_file
         ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0:
+        jobs.append((i, start_time, end_time, clip_file, cmd))
+    
+    # Extrair todos os clipes em paralelo (map mantém a ordem dos segmentos)
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_CLIPS) as executor:
+        results = list(executor.map(lambda job: run_ffmpeg(job[4]), jobs))
+    
+    for (i, start_time, end_time, clip_file, cmd), (returncode, stderr) in zip(jobs, results):
+        if returncode == 0:
             # Verificar se o arquivo foi criado e tem tamanho
             if os.path.exists(clip_file) and os.path.getsize(clip_file) > 0:
                 clip_files.append(clip_file)
@@ -660,7 +775,7 @@ def extract_clips_with_offset(video_path, segments):
             else:
                 print(f"    ❌ Clipe {i}: Arquivo vazio ou não criado - {clip_file}")
         else:
-            print(f"    ❌ Erro no clipe {i}: {result.stderr}")
+            print(f"    ❌ Erro no clipe {i}: {stderr}")
             print(f"    🔧 Comando: {' '.join(cmd)}")
     
     extract_time = time.time() - extract_start
@@ -674,6 +789,12 @@ def check_clip_properties(clip_files):
     print("    🔍 Verificando propriedades dos clipes...")
     
     for i, clip_file in enumerate(clip_files, 1):
+        # Em processo com PyAV quando disponível (sem subprocess por clipe)
+        props = describe_clip_av(clip_file) if AV_AVAILABLE else None
+        if props:
+            print(f"      Clipe {i}: {props}")
+            continue
+        
         cmd = [
             'ffprobe', '-v', 'quiet',
             '-print_format', 'json',
@@ -698,55 +819,50 @@ def check_clip_properties(clip_files):
             print(f"      Clipe {i}: Erro ao obter propriedades")
 
 def merge_clips_sequential(clip_files, output_path):
-    """Mescla clipes usando Concat Demuxer com List File (mais robusto para copy codec)"""
-    print("🎬 Passo 4/4: MESCLANDO clipes com Concat Demuxer + List File...")
+    """Mescla clipes usando Concat Demuxer com lista via stdin (mais robusto para copy codec)"""
+    print("🎬 Passo 4/4: MESCLANDO clipes com Concat Demuxer + lista via stdin...")
     merge_start = time.time()
     
     if not clip_files:
         print("    ❌ Nenhum clipe para mesclar!")
         return False
     
-    # Verificar propriedades dos clipes
-    check_clip_properties(clip_files)
+    # Verificar propriedades dos clipes (um ffprobe por clipe - só em debug)
+    if DEBUG_CLIP_PROPS:
+        check_clip_properties(clip_files)
     
+    list_data = None
     if len(clip_files) == 1:
         # Para 1 clipe, apenas copia
         cmd = [
             'ffmpeg', '-y', 
+            '-hide_banner', '-loglevel', 'error', '-nostats',  # stderr só com erros
             '-i', clip_files[0],
             '-c', 'copy',  # Copy codec sempre
             output_path
         ]
     else:
-        # Para múltiplos clipes, usar concat demuxer com list file
-        list_file = output_path.replace('.mp4', '_list.txt')
-        
-        # Criar arquivo de lista com caminhos absolutos
-        with open(list_file, 'w') as f:
-            for clip_file in clip_files:
-                abs_path = os.path.abspath(clip_file)
-                f.write(f"file '{abs_path}'\n")
+        # Para múltiplos clipes, usar concat demuxer com a lista (caminhos absolutos) pelo stdin
+        list_data = "".join(
+            f"file '{escape_concat_path(os.path.abspath(clip_file))}'\n" for clip_file in clip_files
+        ).encode('utf-8')
         
         cmd = [
             'ffmpeg', '-y',
+            '-hide_banner', '-loglevel', 'error', '-nostats',  # stderr só com erros
             '-f', 'concat',
             '-safe', '0',
-            '-i', list_file,
+            '-protocol_whitelist', 'file,pipe',
+            '-i', 'pipe:0',
             '-c', 'copy',  # Copy codec sempre
             '-avoid_negative_ts', 'make_zero',
             output_path
         ]
     
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    
-    # Cleanup do arquivo de lista
-    if len(clip_files) > 1:
-        list_file = output_path.replace('.mp4', '_list.txt')
-        if os.path.exists(list_file):
-            os.remove(list_file)
+    returncode, stderr = run_ffmpeg(cmd, list_data)
     
-    if result.returncode != 0:
-        print(f"    ❌ Erro na mesclagem: {result.stderr}")
+    if returncode != 0:
+        print(f"    ❌ Erro na mesclagem: {stderr}")
         return False
     
     merge_time = time.time() - merge_start
@@ -851,8 +967,8 @@ def main():
     print("   • COPY CODEC (sem re-encodificação - ultra rápido)")
     print("   • CLIPES 4s+ (duração adequada)")
     print("   • FILTRO ANTI-REPETIÇÃO (gap mínimo 5s entre clipes)")
-    print("   • CONCAT DEMUXER + LIST FILE (mesclagem robusta)")
-    print("   • VERIFICAÇÃO DE PROPRIEDADES (debug de compatibilidade)")
+    print("   • CONCAT DEMUXER via stdin (lista sem arquivo temporário)")
+    print("   • VERIFICAÇÃO DE PROPRIEDADES opcional (DEBUG_CLIP_PROPS)")
     print("   • ORDEM sequencial preservada")
     print("   • DISTRIBUIÇÃO temporal (início, meio, fim do vídeo)")
 
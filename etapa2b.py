@@ -10,11 +10,27 @@ import os
 import json
 import subprocess
 import glob
+import shutil
+import bisect
+import hashlib
 import time
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Dict, List, Optional, Tuple
 
+from pipeline_utils import (
+    file_cache_key, json_loads, load_probe_cache, parse_selected_ids, read_json, save_probe_cache
+)
+
+# ijson é opcional (lê só os segmentos do transcript em streaming, com menos memória)
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
 # =============================================================================
 # CONFIGURAÇÕES
 # =============================================================================
@@ -23,13 +39,30 @@ SOURCES_DIR = "sources"
 OUTPUT_DIR = "output"
 
 # Extensões de vídeo
-VIDEO_EXTENSIONS = ['*.mp4', '*.MP4', '*.avi', '*.mov', '*.mkv']
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv'}
 
 # Configurações de Lower Third
 OVERLAY_FADE_IN = 0.5   # Fade in de 0.5s
 OVERLAY_DURATION = 4.0  # Duração total do lower third
 # Sem fade out - cut direto
 
+# Configurações de encode do teaser com lower thirds
+NVENC_PRESET = 'p1'  # p1-p7: p1 = mais rápido (teaser curto, diferença de qualidade mínima)
+CPU_THREADS = os.cpu_count() or 4
+PIN_CPU_ENCODE_TO_PCORES = True  # Linux + CPU híbrida (P/E-cores): encode na CPU só nos P-cores
+
+# Overlay na GPU (decode CUDA + overlay_cuda + NVENC) quando o ffmpeg suportar
+USE_CUDA_OVERLAY = True
+
+# Máximo de ffprobes simultâneos ao montar a timeline
+MAX_PROBE_WORKERS = 16
+
+# Cache de ffprobe em memória (duração/propriedades); arquivo e chave em pipeline_utils
+PROBE_CACHE = {}
+
+# Cache da timeline dos vídeos originais (chave: hash dos arquivos + mtimes + tamanhos)
+TIMELINE_CACHE_FILE = os.path.join(OUTPUT_DIR, "timeline_cache.json")
+
 # =============================================================================
 # FUNÇÕES AUXILIARES
 # =============================================================================
@@ -41,9 +74,21 @@ def find_latest_file(pattern: str) -> Optional[str]:
         return None
     return max(files, key=os.path.getmtime)
 
+def load_transcript(path: str) -> Dict:
+    """Carrega o transcript; só 'segments' é usado, então com ijson lê apenas eles em streaming."""
+    if IJSON_AVAILABLE:
+        with open(path, 'rb') as f:
+            return {'segments': list(ijson.items(f, 'segments.item', use_float=True))}
+    return read_json(path)
+
 def get_video_duration(video_path: str) -> Optional[float]:
-    """Obtém a duração de um vídeo usando ffprobe."""
+    """Obtém a duração de um vídeo usando ffprobe (consulta o cache primeiro)."""
     try:
+        key = file_cache_key(video_path)
+        cached = PROBE_CACHE.get(key, {})
+        if 'duration' in cached:
+            return cached['duration']
+        
         cmd = [
             'ffprobe',
             '-v', 'quiet',
@@ -51,36 +96,90 @@ def get_video_duration(video_path: str) -> Optional[float]:
             '-of', 'csv=p=0',
             video_path
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, timeout=30)
         if result.returncode != 0:
             return None
-        return float(result.stdout.strip())
+        duration = float(result.stdout.strip())
+        PROBE_CACHE.setdefault(key, {})['duration'] = duration
+        return duration
     except Exception as e:
         print(f"    ❌ Erro ao obter duração: {e}")
         return None
 
+def parse_cpu_list(cpu_list: str) -> frozenset:
+    """Converte lista de CPUs do kernel ('0-7,16') em conjunto de índices."""
+    cpus = set()
+    for part in cpu_list.strip().split(','):
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        cpus.update(range(int(first), int(last or first) + 1))
+    return frozenset(cpus)
+
+@lru_cache(maxsize=1)
+def get_performance_cores() -> Optional[frozenset]:
+    """P-cores de CPUs híbridas (Intel 12ª geração+) no Linux; None se não houver distinção."""
+    try:
+        with open('/sys/devices/cpu_core/cpus', 'r') as f:
+            cpus = parse_cpu_list(f.read())
+    except (OSError, ValueError):
+        return None
+    
+    # Só fixa se o processo pode rodar nesses cores (respeita taskset/cgroups externos)
+    if hasattr(os, 'sched_getaffinity'):
+        cpus &= os.sched_getaffinity(0)
+    return cpus or None
+
+def x265_params(threads: int) -> str:
+    """Parâmetros de threading do x265 (pools + frame threads + WPP) para N threads."""
+    return f"pools={threads}:frame-threads={min(16, max(2, threads // 2))}:wpp=1:pmode=1"
+
+@lru_cache(maxsize=1)
+def check_cuda_overlay_support() -> bool:
+    """Verifica se o ffmpeg tem o filtro overlay_cuda (overlay sem sair da GPU)."""
+    try:
+        cmd = ['ffmpeg', '-hide_banner', '-filters']
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, timeout=10)
+        return 'overlay_cuda' in result.stdout
+    except (OSError, subprocess.SubprocessError):
+        return False
+
+@lru_cache(maxsize=1)
 def check_nvenc_support() -> bool:
-    """Verifica se NVENC (NVIDIA) está disponível."""
+    """Verifica se NVENC (NVIDIA) está disponível (consulta o ffmpeg uma vez por execução)."""
     try:
         cmd = ['ffmpeg', '-hide_banner', '-encoders']
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, timeout=10)
         return 'hevc_nvenc' in result.stdout or 'h264_nvenc' in result.stdout
     except:
         return False
 
+def parse_rational(value: str) -> float:
+    """Converte fração do ffprobe ('30000/1001') em float, sem eval."""
+    num, _, den = value.partition('/')
+    if not den:
+        return float(num)
+    den = int(den)
+    return int(num) / den if den else 0.0
+
 def get_video_properties(video_path: str) -> Dict:
-    """Obtém propriedades do vídeo (codec, resolução, fps, bitrate)."""
+    """Obtém propriedades do vídeo (codec, resolução, fps, bitrate), consultando o cache primeiro."""
     try:
+        key = file_cache_key(video_path)
+        cached = PROBE_CACHE.get(key, {})
+        if 'props' in cached:
+            return dict(cached['props'])
+        
         cmd = [
             'ffprobe', '-v', 'quiet', '-print_format', 'json',
             '-show_format', '-show_streams', video_path
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=30)
         
         if result.returncode != 0:
             return {}
         
-        data = json.loads(result.stdout)
+        data = json_loads(result.stdout)
         props = {}
         
         # Propriedades do vídeo
@@ -90,7 +189,7 @@ def get_video_properties(video_path: str) -> Dict:
                     props['codec'] = stream.get('codec_name', 'hevc')
                     props['width'] = int(stream.get('width', 1920))
                     props['height'] = int(stream.get('height', 1080))
-                    props['fps'] = eval(stream.get('r_frame_rate', '30/1'))
+                    props['fps'] = parse_rational(stream.get('r_frame_rate', '30/1'))
                     props['pix_fmt'] = stream.get('pix_fmt', 'yuv420p')
                     break
         
@@ -98,7 +197,8 @@ def get_video_properties(video_path: str) -> Dict:
         if 'format' in data:
             props['bitrate'] = int(data['format'].get('bit_rate', 0))
         
-        return props
+        PROBE_CACHE.setdefault(key, {})['props'] = props
+        return dict(props)
         
     except Exception as e:
         print(f"    ❌ Erro ao obter propriedades: {e}")
@@ -118,21 +218,39 @@ def format_time(seconds: float) -> str:
 def build_video_timeline(sources_dir: str) -> List[Dict]:
     """Constrói timeline dos vídeos originais com timestamps acumulados."""
     # Lista vídeos originais
-    video_files = []
-    for ext in VIDEO_EXTENSIONS:
-        video_files.extend(glob.glob(os.path.join(sources_dir, ext)))
-    video_files = list(set(video_files))
-    video_files.sort()
+    if not os.path.isdir(sources_dir):
+        return []
+    
+    # Uma única varredura do diretório (sem glob por extensão nem dedup)
+    with os.scandir(sources_dir) as entries:
+        video_files = sorted(
+            entry.path for entry in entries
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in VIDEO_EXTENSIONS
+        )
     
     if not video_files:
         return []
     
+    # Timeline em cache se nenhum vídeo mudou
+    sources_key = hashlib.sha1("\n".join(file_cache_key(f) for f in video_files).encode('utf-8')).hexdigest()
+    if os.path.exists(TIMELINE_CACHE_FILE):
+        try:
+            cached = read_json(TIMELINE_CACHE_FILE)
+            if cached.get('key') == sources_key:
+                print("    💾 Timeline carregada do cache")
+                return cached['timeline']
+        except Exception as e:
+            print(f"    ⚠️ Erro ao carregar cache da timeline: {e}")
+    
     timeline = []
     accumulated_time = 0.0
     
-    for video_path in video_files:
+    # ffprobes em paralelo (map preserva a ordem dos arquivos)
+    with ThreadPoolExecutor(max_workers=min(MAX_PROBE_WORKERS, len(video_files))) as executor:
+        durations = list(executor.map(get_video_duration, video_files))
+    
+    for video_path, duration in zip(video_files, durations):
         video_name = os.path.basename(video_path)
-        duration = get_video_duration(video_path)
         
         if duration is None:
             print(f"    ⚠️ Não foi possível obter duração de {video_name}")
@@ -148,17 +266,33 @@ def build_video_timeline(sources_dir: str) -> List[Dict]:
         
         accumulated_time += duration
     
+    # Só guarda timelines completas (falha de ffprobe não fica congelada no cache)
+    if len(timeline) == len(video_files):
+        try:
+            os.makedirs(OUTPUT_DIR, exist_ok=True)
+            with open(TIMELINE_CACHE_FILE, 'w', encoding='utf-8') as f:
+                json.dump({'key': sources_key, 'timeline': timeline}, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"    ⚠️ Erro ao salvar cache da timeline: {e}")
+    
     return timeline
 
-def find_video_for_timestamp(timeline: List[Dict], timestamp: float) -> Optional[str]:
-    """Encontra qual vídeo original contém um determinado timestamp."""
-    for video_info in timeline:
-        if video_info['start_time'] <= timestamp < video_info['end_time']:
-            return video_info['video_name']
+def find_video_for_timestamp(
+    timeline: List[Dict],
+    timestamp: float,
+    starts: Optional[List[float]] = None
+) -> Optional[str]:
+    """Encontra qual vídeo original contém um determinado timestamp (busca binária nos inícios)."""
+    if starts is None:
+        starts = [v['start_time'] for v in timeline]
+    
+    idx = bisect.bisect_right(starts, timestamp) - 1
+    if idx < 0:
+        return None
     
-    # Último vídeo (edge case)
-    if timeline and timestamp >= timeline[-1]['start_time']:
-        return timeline[-1]['video_name']
+    # Último vídeo (edge case): timestamps além do fim caem nele
+    if timestamp < timeline[idx]['end_time'] or idx == len(timeline) - 1:
+        return timeline[idx]['video_name']
     
     return None
 
@@ -175,16 +309,14 @@ def map_teaser_clips_to_videos(
     """Mapeia clipes do teaser para vídeos originais e lower thirds."""
     
     # Parse dos IDs selecionados pelo GPT
-    try:
-        selected_ids = [int(x.strip()) for x in gpt_response.split(',') if x.strip().isdigit()]
-    except:
-        print("    ❌ Erro ao parsear IDs do GPT")
-        return []
+    # Mesmo parser da etapa 2: as duas etapas precisam chegar à mesma lista de IDs
+    selected_ids = parse_selected_ids(gpt_response)
     
     segments = transcript_data.get('segments', [])
     clips_mapping = []
     
     accumulated_duration = 0.0
+    timeline_starts = [v['start_time'] for v in timeline]  # ordenados (timeline acumulada)
     
     for segment_id in selected_ids:
         # Usa o ID como índice do array (GPT retorna índices 0-N)
@@ -199,7 +331,7 @@ def map_teaser_clips_to_videos(
         duration = end_in_concat - start_in_concat
         
         # Encontra qual vídeo original contém este segmento
-        video_name = find_video_for_timestamp(timeline, start_in_concat)
+        video_name = find_video_for_timestamp(timeline, start_in_concat, timeline_starts)
         
         if not video_name:
             print(f"      ⚠️ Segmento ID {segment_id} @ {start_in_concat:.1f}s: vídeo não encontrado na timeline")
@@ -209,9 +341,12 @@ def map_teaser_clips_to_videos(
         # Verifica se este vídeo tem lower third disponível
         has_lower_third = video_name in locations_data
         lower_third_png = None
+        lower_third_y = 0
         
         if has_lower_third:
             lower_third_png = locations_data[video_name].get('png_path')
+            # PNGs recortados na faixa inferior (mapas antigos: quadro inteiro, y = 0)
+            lower_third_y = locations_data[video_name].get('overlay_y', 0)
         
         clips_mapping.append({
             'segment_id': segment_id,
@@ -222,13 +357,82 @@ def map_teaser_clips_to_videos(
             'end_in_teaser': accumulated_duration + duration,
             'video_name': video_name,
             'has_lower_third': has_lower_third,
-            'lower_third_png': lower_third_png
+            'lower_third_png': lower_third_png,
+            'lower_third_y': lower_third_y
         })
         
         accumulated_duration += duration
     
     return clips_mapping
 
+def link_or_copy(src_path: str, dst_path: str):
+    """Liga dst_path ao mesmo arquivo de src_path (hardlink, sem copiar bytes); copia se não der."""
+    if os.path.exists(dst_path):
+        os.remove(dst_path)
+    try:
+        os.link(src_path, dst_path)
+    except OSError:
+        shutil.copy2(src_path, dst_path)
+
+def build_overlay_filter(overlays: List[Tuple[str, int, float, float]], use_cuda: bool) -> Tuple[str, str]:
+    """Monta o filtergraph encadeado: [k:v] PNG com fade -> [ovk]; [anterior][ovk] overlay -> [vk].
+    
+    Retorna (filter_complex, label do último vídeo).
+    """
+    filter_parts = []
+    prev_label = "0:v"
+    
+    if use_cuda:
+        # Decode CUDA entrega NV12; overlay_cuda só aceita overlay yuva420p sobre main yuv420p
+        filter_parts.append("[0:v]scale_cuda=format=yuv420p[base]")
+        prev_label = "base"
+    
+    for input_index, (_, y, start_time, end_time) in enumerate(overlays, 1):
+        if use_cuda:
+            # overlay_cuda: PNG em yuva420p na VRAM; a janela vem do trim (timestamps preservados)
+            filter_parts.append(
+                f"[{input_index}:v]format=rgba,"
+                f"fade=t=in:st={start_time}:d={OVERLAY_FADE_IN}:alpha=1,"
+                f"trim=start={start_time}:end={end_time},format=yuva420p,hwupload[ov{input_index}]"
+            )
+            filter_parts.append(
+                f"[{prev_label}][ov{input_index}]overlay_cuda=x=0:y={y}:eof_action=pass[v{input_index}]"
+            )
+        else:
+            filter_parts.append(
+                f"[{input_index}:v]format=rgba,"
+                f"fade=t=in:st={start_time}:d={OVERLAY_FADE_IN}:alpha=1[ov{input_index}]"
+            )
+            filter_parts.append(
+                f"[{prev_label}][ov{input_index}]overlay=0:{y}:eof_action=pass:"
+                f"enable='between(t,{start_time},{end_time})'[v{input_index}]"
+            )
+        prev_label = f"v{input_index}"
+    
+    return ";".join(filter_parts), prev_label
+
+def run_overlay_encode(cmd: List[str], cpus: Optional[frozenset] = None) -> bool:
+    """Executa o encode com overlays (fixado nas CPUs indicadas, se houver); retorna True se deu certo."""
+    preexec_fn = None
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        preexec_fn = lambda: os.sched_setaffinity(0, cpus)
+    
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=1800, preexec_fn=preexec_fn)
+        
+        if result.returncode != 0:
+            print(f"    ❌ Erro FFmpeg: {result.stderr[-300:]}")
+            return False
+        
+    except subprocess.TimeoutExpired:
+        print("    ❌ Timeout ao aplicar lower thirds")
+        return False
+    except Exception as e:
+        print(f"    ❌ Erro: {e}")
+        return False
+    
+    return True
+
 def apply_lower_thirds_to_teaser(
     teaser_path: str,
     clips_mapping: List[Dict],
@@ -252,9 +456,8 @@ def apply_lower_thirds_to_teaser(
     
     if not clips_with_lt:
         print("    ⚠️ Nenhum clipe tem lower third disponível")
-        # Copia o teaser original
-        import shutil
-        shutil.copy2(teaser_path, output_path)
+        # Reaproveita o teaser original
+        link_or_copy(teaser_path, output_path)
         return True
     
     # Verifica suporte NVENC
@@ -264,14 +467,51 @@ def apply_lower_thirds_to_teaser(
     else:
         print("    💻 Usando CPU (NVENC não disponível)")
     
-    # Monta comando FFmpeg baseado no exemplo da etapa8c.py
-    # Cada overlay é aplicado individualmente com fade
+    # Configurações de encode (um único encode para todos os overlays)
+    codec = props.get('codec', 'hevc')
+    bitrate = props.get('bitrate', 0)
+    
+    # Encode na CPU fica nos P-cores (threads do x265 em cores uniformes, sem pular para E-cores)
+    encode_cpus = None
+    if not has_nvenc and PIN_CPU_ENCODE_TO_PCORES:
+        encode_cpus = get_performance_cores()
+        if encode_cpus:
+            print(f"    📌 Encode fixado em {len(encode_cpus)} P-cores")
+    encode_threads = len(encode_cpus) if encode_cpus else CPU_THREADS
+    
+    if has_nvenc and (codec == 'hevc' or codec == 'h265'):
+        # NVENC HEVC (muito mais rápido!)
+        encode_args = [
+            '-c:v', 'hevc_nvenc',
+            '-preset', NVENC_PRESET,
+            '-rc', 'vbr',
+            '-cq', '23',
+            '-b:v', '0'
+        ]
+        if bitrate > 0:
+            encode_args.extend(['-maxrate', str(bitrate), '-bufsize', str(bitrate * 2)])
+    elif has_nvenc:
+        # NVENC H.264 (fallback)
+        encode_args = [
+            '-c:v', 'h264_nvenc',
+            '-preset', NVENC_PRESET,
+            '-rc', 'vbr',
+            '-cq', '23',
+            '-b:v', '0'
+        ]
+    elif codec == 'hevc' or codec == 'h265':
+        # CPU HEVC
+        encode_args = ['-c:v', 'libx265', '-preset', 'fast', '-crf', '23', '-x265-params', x265_params(encode_threads)]
+        if bitrate > 0:
+            encode_args.extend(['-b:v', str(bitrate)])
+    else:
+        # CPU H.264
+        encode_args = ['-c:v', 'libx264', '-preset', 'fast', '-crf', '23']
     
-    print(f"\n🎬 Processando {len(clips_with_lt)} lower thirds...")
+    print(f"\n🎬 Processando {len(clips_with_lt)} lower thirds em uma única passada...")
     
-    # Vamos aplicar os overlays um por vez para garantir que funcionem
-    current_input = teaser_path
-    temp_outputs = []
+    # Coleta as janelas de overlay válidas (PNG, y, início, fim)
+    overlays = []
     
     for idx, clip in enumerate(clips_with_lt):
         if not clip['lower_third_png'] or not os.path.exists(clip['lower_third_png']):
@@ -282,112 +522,73 @@ def apply_lower_thirds_to_teaser(
         end_time = min(start_time + OVERLAY_DURATION, clip['end_in_teaser'])
         duration = end_time - start_time
         
-        print(f"    🎨 Aplicando lower third {idx+1}/{len(clips_with_lt)}...")
+        print(f"    🎨 Lower third {idx+1}/{len(clips_with_lt)}...")
         print(f"        📍 Posição: {start_time:.1f}s-{end_time:.1f}s ({duration:.1f}s)")
         print(f"        🖼️  PNG: {os.path.basename(clip['lower_third_png'])}")
         
-        # Determina output (último overlay vai para output_path final)
-        if idx == len(clips_with_lt) - 1:
-            current_output = output_path
-        else:
-            temp_out = os.path.join(OUTPUT_DIR, f"temp_overlay_{idx}.mp4")
-            temp_outputs.append(temp_out)
-            current_output = temp_out
-        
-        # Filtro complexo: PNG com fade + overlay
-        filter_complex = (
-            f"[1:v]format=rgba,"
-            f"fade=t=in:st=0:d={OVERLAY_FADE_IN}:alpha=1[ov];"
-            f"[0:v][ov]overlay=0:0:enable='between(t,{start_time},{end_time})'"
-        )
-        
-        # Configurações de encode
-        codec = props.get('codec', 'hevc')
-        bitrate = props.get('bitrate', 0)
-        
-        if has_nvenc and (codec == 'hevc' or codec == 'h265'):
-            # NVENC HEVC (muito mais rápido!)
-            encode_args = [
-                '-c:v', 'hevc_nvenc',
-                '-preset', 'p4',  # p1-p7, p4 = balanced
-                '-rc', 'vbr',
-                '-cq', '23',
-                '-b:v', '0'
-            ]
-            if bitrate > 0:
-                encode_args.extend(['-maxrate', str(bitrate), '-bufsize', str(bitrate * 2)])
-        elif has_nvenc:
-            # NVENC H.264 (fallback)
-            encode_args = [
-                '-c:v', 'h264_nvenc',
-                '-preset', 'p4',
-                '-rc', 'vbr',
-                '-cq', '23',
-                '-b:v', '0'
-            ]
-        elif codec == 'hevc' or codec == 'h265':
-            # CPU HEVC
-            encode_args = ['-c:v', 'libx265', '-preset', 'fast', '-crf', '23']
-            if bitrate > 0:
-                encode_args.extend(['-b:v', str(bitrate)])
-        else:
-            # CPU H.264
-            encode_args = ['-c:v', 'libx264', '-preset', 'fast', '-crf', '23']
-        
-        # Comando FFmpeg
+        overlays.append((str(clip['lower_third_png']), clip['lower_third_y'], start_time, end_time))
+    
+    if not overlays:
+        print("    ⚠️ Nenhum PNG de lower third encontrado")
+        link_or_copy(teaser_path, output_path)
+        return True
+    
+    # Cada PNG vira um stream esparso que só existe na sua janela: -itsoffset desloca o início
+    # e -t limita a duração. Antes do primeiro frame e depois do último (eof_action=pass) o
+    # overlay só repassa o vídeo, então cada PNG é decodificado só durante o seu overlay
+    png_inputs = []
+    for png_path, _, start_time, end_time in overlays:
+        png_inputs.extend([
+            '-loop', '1',
+            '-t', f"{end_time - start_time:.3f}",
+            '-itsoffset', f"{start_time:.3f}",
+            '-i', png_path
+        ])
+    
+    output_args = [
+        '-map', '0:a?',
+        *encode_args,
+        '-c:a', 'copy',
+        '-avoid_negative_ts', 'make_zero',
+        '-shortest',
+        '-movflags', '+faststart',
+        str(output_path)
+    ]
+    
+    # GPU: decode, overlay e encode ficam na VRAM (sem cópias GPU <-> CPU por frame)
+    if has_nvenc and USE_CUDA_OVERLAY and check_cuda_overlay_support():
+        filter_complex, last_label = build_overlay_filter(overlays, use_cuda=True)
         cmd = [
             'ffmpeg', '-y',
-            '-i', str(current_input),
-            '-loop', '1', '-i', str(clip['lower_third_png']),
+            '-init_hw_device', 'cuda=cu', '-filter_hw_device', 'cu',
+            '-hwaccel', 'cuda', '-hwaccel_device', 'cu', '-hwaccel_output_format', 'cuda',
+            '-fflags', '+genpts',
+            '-i', str(teaser_path),
+            *png_inputs,
             '-filter_complex', filter_complex,
-            *encode_args,
-            '-c:a', 'copy',
-            '-shortest',
-            '-movflags', '+faststart',
-            str(current_output)
+            '-map', f"[{last_label}]",
+            *output_args
         ]
-        
-        # Executa
-        try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=1800)
-            
-            if result.returncode != 0:
-                print(f"    ❌ Erro FFmpeg: {result.stderr[:300]}")
-                # Limpa arquivos temporários
-                for temp_file in temp_outputs:
-                    if os.path.exists(temp_file):
-                        os.remove(temp_file)
-                return False
-            
-            print(f"    ✅ Lower third {idx+1} aplicado!")
-            
-            # Atualiza input para próxima iteração
-            if idx < len(clips_with_lt) - 1:
-                current_input = current_output
-            
-        except subprocess.TimeoutExpired:
-            print(f"    ❌ Timeout no overlay {idx+1}")
-            # Limpa arquivos temporários
-            for temp_file in temp_outputs:
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
-            return False
-        except Exception as e:
-            print(f"    ❌ Erro: {e}")
-            # Limpa arquivos temporários
-            for temp_file in temp_outputs:
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
-            return False
-    
-    # Limpa arquivos temporários
-    for temp_file in temp_outputs:
-        if os.path.exists(temp_file):
-            try:
-                os.remove(temp_file)
-                print(f"    🧹 Removido temporário: {os.path.basename(temp_file)}")
-            except:
-                pass
+        print("    🎮 Overlay na GPU (overlay_cuda)")
+        if run_overlay_encode(cmd):
+            print("\n    ✅ Todos os lower thirds aplicados com sucesso!")
+            return True
+        print("    ⚠️ Overlay na GPU falhou - tentando overlay na CPU")
+    
+    # Todos os overlays em um único filtergraph: o teaser é decodificado e encodado uma vez só
+    filter_complex, last_label = build_overlay_filter(overlays, use_cuda=False)
+    cmd = [
+        'ffmpeg', '-y',
+        '-fflags', '+genpts',
+        '-i', str(teaser_path),
+        *png_inputs,
+        '-filter_complex', filter_complex,
+        '-map', f"[{last_label}]",
+        *output_args
+    ]
+    
+    if not run_overlay_encode(cmd, encode_cpus):
+        return False
     
     print("\n    ✅ Todos os lower thirds aplicados com sucesso!")
     return True
@@ -439,16 +640,14 @@ def main():
     print("\n📖 Carregando dados...")
     
     try:
-        with open(transcript_path, 'r', encoding='utf-8') as f:
-            transcript_data = json.load(f)
+        transcript_data = load_transcript(transcript_path)
         print(f"    ✅ Transcript: {len(transcript_data.get('segments', []))} segmentos")
     except Exception as e:
         print(f"    ❌ Erro ao carregar transcript: {e}")
         return
     
     try:
-        with open(gpt_debug_path, 'r', encoding='utf-8') as f:
-            gpt_debug = json.load(f)
+        gpt_debug = read_json(gpt_debug_path)
         
         # Extrai resposta do GPT
         gpt_response = None
@@ -478,8 +677,7 @@ def main():
         return
     
     try:
-        with open(locations_path, 'r', encoding='utf-8') as f:
-            locations_data = json.load(f)
+        locations_data = read_json(locations_path)
         print(f"    ✅ Locations: {len(locations_data)} vídeos com GPS")
     except Exception as e:
         print(f"    ❌ Erro ao carregar locations: {e}")
@@ -487,7 +685,9 @@ def main():
     
     # 3. Constrói timeline dos vídeos originais
     print("\n🗺️  Construindo timeline dos vídeos originais...")
+    PROBE_CACHE.update(load_probe_cache())
     timeline = build_video_timeline(SOURCES_DIR)
+    save_probe_cache(PROBE_CACHE)
     
     if not timeline:
         print("    ❌ Não foi possível construir timeline")
@@ -545,6 +745,7 @@ def main():
         clips_mapping,
         output_path
     )
+    save_probe_cache(PROBE_CACHE)
     
     if not success:
         print("\n❌ Falha ao aplicar lower thirds")
@@ -6,11 +6,15 @@ Etapa 3: Verificar duração do teaser + selecionar BGM adequado + mesclar com -
 
 import os
 import subprocess
-import json
-from pathlib import Path
+import struct
+import wave
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import time
 
+from pipeline_utils import read_json, run_ffmpeg, write_json
+
 # =============================================================================
 # CONFIGURAÇÕES - ALTERE AQUI CONFORME NECESSÁRIO
 # =============================================================================
@@ -20,49 +24,156 @@ INPUT_DIR = "output"
 ASSETS_DIR = "assets"
 OUTPUT_DIR = "output"
 
+# Extensões de BGM aceitas (comparação sem diferenciar maiúsculas)
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.m4a', '.aac', '.ogg')
+
+# BGM em cache com duração até N segundos acima do teaser é aceito sem probar os novos
+BGM_MATCH_TOLERANCE = 1.0
+
+# Máximo de ffprobes simultâneos para BGMs fora do cache
+MAX_PROBE_WORKERS = 8
+
 # Configurações de áudio
 BGM_VOLUME_DB = -5  # Volume do BGM em dB (negativo = mais baixo que o áudio original)
 FADE_OUT_DURATION = 2.0  # Duração do fade out em segundos
 AUDIO_CODEC = 'aac'
 AUDIO_BITRATE = '128k'
 
+# Filtergraph da mescla: BGM com volume ajustado + amix com o áudio do teaser + fade out no final
+BGM_FILTER_TEMPLATE = (
+    '[1:a]volume={volume}dB[bgm];'
+    '[0:a][bgm]amix=inputs=2:duration=first:dropout_transition=0[audio_mixed];'
+    '[audio_mixed]afade=t=out:st={fade_start:.1f}:d={fade_duration}[audio]'
+)
+
 # Configurações de vídeo - ULTRA OTIMIZADO PARA 4K
 VIDEO_CODEC = 'copy'  # Manter codec original (hevc)
 VIDEO_PRESET = None   # Não aplicável com copy
 VIDEO_QUALITY = None  # Não aplicável com copy
 
+# Entradas de cada diretório, varridas uma vez por execução (validate_config)
+DIR_ENTRIES = {}
+
 # =============================================================================
 
+def list_dir(directory):
+    """Entradas do diretório (varre uma vez por execução e reaproveita)"""
+    if directory not in DIR_ENTRIES:
+        with os.scandir(directory) as entries:
+            DIR_ENTRIES[directory] = list(entries)
+    return DIR_ENTRIES[directory]
+
 def validate_config():
-    """Valida as configurações do programa"""
-    if not os.path.exists(INPUT_DIR):
+    """Valida as configurações do programa (a varredura dos diretórios já fica guardada para os finders)"""
+    try:
+        list_dir(INPUT_DIR)
+    except OSError:
         print(f"❌ Diretório de entrada '{INPUT_DIR}' não encontrado!")
         return False
     
-    if not os.path.exists(ASSETS_DIR):
+    try:
+        list_dir(ASSETS_DIR)
+    except OSError:
         print(f"❌ Diretório de assets '{ASSETS_DIR}' não encontrado!")
         return False
     
     return True
 
+def scan_files(directory, suffixes):
+    """Arquivos do diretório cujo nome termina com um dos sufixos (sem diferenciar maiúsculas)"""
+    return [entry for entry in list_dir(directory) if entry.is_file() and entry.name.lower().endswith(suffixes)]
+
 def find_latest_teaser():
     """Encontra o teaser mais recente na pasta output"""
     # Buscar especificamente por arquivos teaser_sequential.mp4
-    teaser_files = []
-    for pattern in ['*teaser_sequential.mp4', '*teaser_sequential.MP4']:
-        teaser_files.extend(Path(INPUT_DIR).glob(pattern))
+    teaser_files = scan_files(INPUT_DIR, 'teaser_sequential.mp4')
     
     if not teaser_files:
         print(f"❌ Nenhum teaser encontrado na pasta '{INPUT_DIR}'")
         return None
     
-    # Ordenar por data de modificação (mais recente primeiro)
+    # Mais recente por data de modificação (stat do DirEntry)
     latest_teaser = max(teaser_files, key=lambda x: x.stat().st_mtime)
     print(f"    📁 Teaser selecionado: {latest_teaser.name}")
-    return str(latest_teaser)
+    return latest_teaser.path
+
+def read_mp4_duration(file_path):
+    """Lê a duração direto dos átomos do MP4/M4A/MOV sem ffprobe; None se não encontrar
+    
+    Usa moov/mvhd; em MP4 fragmentado (mvhd com duração 0) usa moov/mvex/mehd.
+    """
+    timescale = None
+    with open(file_path, 'rb') as f:
+        end = os.fstat(f.fileno()).st_size
+        pos = 0
+        while pos + 8 <= end:
+            f.seek(pos)
+            size, box_type = struct.unpack('>I4s', f.read(8))
+            header = 8
+            if size == 1:  # tamanho de 64 bits
+                size = struct.unpack('>Q', f.read(8))[0]
+                header = 16
+            elif size == 0:  # vai até o fim do arquivo
+                size = end - pos
+            if size < header:
+                return None
+            
+            if box_type in (b'moov', b'mvex'):
+                # Entra no container (mvhd é filho do moov; mehd é filho do mvex)
+                end = pos + size
+                pos += header
+                continue
+            
+            if box_type == b'mvhd':
+                version = f.read(4)[0]
+                if version == 1:
+                    _, _, timescale, duration = struct.unpack('>QQIQ', f.read(28))
+                else:
+                    _, _, timescale, duration = struct.unpack('>IIII', f.read(16))
+                if not timescale:
+                    return None
+                if duration:
+                    return duration / timescale
+                # MP4 fragmentado: duração fica no mehd
+            
+            elif box_type == b'mehd' and timescale:
+                version = f.read(4)[0]
+                fmt = '>Q' if version == 1 else '>I'
+                fragment_duration = struct.unpack(fmt, f.read(struct.calcsize(fmt)))[0]
+                return fragment_duration / timescale if fragment_duration else None
+            
+            pos += size
+    return None
+
+def read_wav_duration(file_path):
+    """Lê a duração do cabeçalho WAV (PCM) sem ffprobe"""
+    with wave.open(file_path, 'rb') as w:
+        rate = w.getframerate()
+        return w.getnframes() / rate if rate else None
 
 def get_audio_duration(file_path):
-    """Obtém a duração de um arquivo de áudio/vídeo usando ffprobe"""
+    """Obtém a duração de um arquivo de áudio/vídeo (memorizada por caminho + mtime + tamanho)"""
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    return _get_audio_duration_cached(os.path.abspath(file_path), st.st_mtime_ns, st.st_size)
+
+@lru_cache(maxsize=128)
+def _get_audio_duration_cached(file_path, mtime_ns, size):
+    """Obtém a duração de um arquivo de áudio/vídeo (cabeçalho do container quando possível, senão ffprobe)"""
+    ext = os.path.splitext(file_path)[1].lower()
+    try:
+        duration = None
+        if ext in ('.mp4', '.m4a', '.mov'):
+            duration = read_mp4_duration(file_path)
+        elif ext == '.wav':
+            duration = read_wav_duration(file_path)
+        if duration:
+            return duration
+    except (OSError, struct.error, wave.Error, EOFError, IndexError):
+        pass  # Cabeçalho inesperado: usa ffprobe
+    
     cmd = [
         'ffprobe',
         '-v', 'quiet',
@@ -82,20 +193,19 @@ def get_bgm_cache_path():
 def load_bgm_cache():
     """Carrega cache de durações dos BGMs se existir"""
     cache_path = get_bgm_cache_path()
-    if os.path.exists(cache_path):
-        try:
-            with open(cache_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"      ⚠️ Erro ao carregar cache BGM: {e}")
+    try:
+        return read_json(cache_path)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"      ⚠️ Erro ao carregar cache BGM: {e}")
     return {}
 
 def save_bgm_cache(bgm_durations):
     """Salva cache de durações dos BGMs"""
     cache_path = get_bgm_cache_path()
     try:
-        with open(cache_path, 'w', encoding='utf-8') as f:
-            json.dump(bgm_durations, f, ensure_ascii=False, indent=2)
+        write_json(cache_path, bgm_durations)
         print(f"      💾 Cache BGM salvo: {os.path.basename(cache_path)}")
     except Exception as e:
         print(f"      ⚠️ Erro ao salvar cache BGM: {e}")
@@ -108,12 +218,7 @@ def find_suitable_bgm(teaser_duration):
     bgm_cache = load_bgm_cache()
     
     # Buscar arquivos de áudio na pasta assets
-    audio_extensions = ['*.mp3', '*.wav', '*.m4a', '*.aac', '*.ogg']
-    audio_files = []
-    
-    for ext in audio_extensions:
-        audio_files.extend(Path(ASSETS_DIR).glob(ext))
-        audio_files.extend(Path(ASSETS_DIR).glob(ext.upper()))
+    audio_files = scan_files(ASSETS_DIR, AUDIO_EXTENSIONS)
     
     if not audio_files:
         print(f"    ❌ Nenhum arquivo de áudio encontrado na pasta '{ASSETS_DIR}'")
@@ -121,31 +226,55 @@ def find_suitable_bgm(teaser_duration):
     
     print(f"    📁 Encontrados {len(audio_files)} arquivos de áudio")
     
-    # Verificar duração de cada arquivo (usando cache quando possível)
+    # Separa em uma passada: durações já em cache x arquivos a probar
+    cached = {}
+    uncached = []
+    for audio_file in audio_files:
+        duration = bgm_cache.get(audio_file.name)
+        if duration is None:
+            uncached.append(audio_file)
+        else:
+            cached[audio_file.name] = duration
+    
+    # Atalho: BGM em cache (sem custo) que já serve quase exatamente dispensa probar os novos
+    cached_fits = [f for f in audio_files if cached.get(f.name, -1) >= teaser_duration]
+    if cached_fits:
+        best_cached = min(cached_fits, key=lambda f: cached[f.name])
+        duration = cached[best_cached.name]
+        if duration <= teaser_duration + BGM_MATCH_TOLERANCE:
+            print(f"    ✅ BGM selecionado (cache): {best_cached.name} ({duration:.1f}s)")
+            return {'path': best_cached.path, 'name': best_cached.name, 'duration': duration}
+    
+    # Durações dos arquivos fora do cache em paralelo (cada ffprobe é um processo separado)
+    probed = {}
+    if uncached:
+        with ThreadPoolExecutor(max_workers=min(MAX_PROBE_WORKERS, len(uncached))) as executor:
+            durations = executor.map(get_audio_duration, [f.path for f in uncached])
+            probed = dict(zip([f.name for f in uncached], durations))
+    
+    # Novas durações entram no cache de uma vez
+    new_durations = {name: duration for name, duration in probed.items() if duration is not None}
+    bgm_cache.update(new_durations)
+    cache_updated = bool(new_durations)
+    
+    # Verificar duração de cada arquivo
     suitable_bgms = []
-    cache_updated = False
     
     for audio_file in audio_files:
-        file_path = str(audio_file)
         file_name = audio_file.name
         
-        # Verificar se já está no cache
-        if file_name in bgm_cache:
-            duration = bgm_cache[file_name]
+        if file_name in cached:
+            duration = cached[file_name]
             print(f"      🎶 {file_name}: {duration:.1f}s (cache)")
+        elif file_name in new_durations:
+            duration = new_durations[file_name]
+            print(f"      🎶 {file_name}: {duration:.1f}s (novo)")
         else:
-            # Obter duração e salvar no cache
-            duration = get_audio_duration(file_path)
-            if duration is not None:
-                bgm_cache[file_name] = duration
-                cache_updated = True
-                print(f"      🎶 {file_name}: {duration:.1f}s (novo)")
-            else:
-                continue
+            continue
         
         if duration >= teaser_duration:
             suitable_bgms.append({
-                'path': file_path,
+                'path': audio_file.path,
                 'name': file_name,
                 'duration': duration
             })
@@ -164,28 +293,21 @@ def find_suitable_bgm(teaser_duration):
     print(f"    ✅ BGM selecionado: {best_bgm['name']} ({best_bgm['duration']:.1f}s)")
     return best_bgm
 
-def add_bgm_to_teaser(teaser_path, bgm_path, output_path):
-    """Adiciona BGM ao teaser com volume configurável e fade out"""
+def add_bgm_to_teaser(teaser_path, bgm_path, output_path, teaser_duration, bgm_duration):
+    """Adiciona BGM ao teaser com volume configurável e fade out (durações já obtidas pelo main)"""
     print(f"🎵 Passo 2/2: MESCLANDO teaser com BGM + fade out ({FADE_OUT_DURATION}s)...")
-    print(f"    ⏱️  Teaser: {get_audio_duration(teaser_path):.2f}s | BGM: {get_audio_duration(bgm_path):.2f}s")
+    print(f"    ⏱️  Teaser: {teaser_duration:.2f}s | BGM: {bgm_duration:.2f}s")
     merge_start = time.time()
     
-    # Obter duração do teaser para calcular o fade out
-    teaser_duration = get_audio_duration(teaser_path)
-    if not teaser_duration:
-        print("    ❌ Erro ao obter duração do teaser")
-        return False
-    
     fade_start = max(0, teaser_duration - FADE_OUT_DURATION)  # Fade out começa N segundos antes do fim
     
     # ESTRATÉGIA: Primeiro ajustar BGM para duração exata, depois mesclar
-    temp_audio = output_path.replace('.mp4', '_temp_audio.aac')
     temp_bgm = output_path.replace('.mp4', '_temp_bgm.wav')
     
     # Passo 0: Ajustar BGM para ter EXATAMENTE a mesma duração do teaser
-    print(f"    🔧 Passo 0/3: Ajustando BGM para {teaser_duration:.2f}s...")
+    print(f"    🔧 Passo 0/1: Ajustando BGM para {teaser_duration:.2f}s...")
     cmd_bgm_adjust = [
-        'ffmpeg', '-y',
+        'ffmpeg', '-y', '-nostats',
         '-stream_loop', '-1',  # Loop infinito
         '-i', bgm_path,
         '-t', str(teaser_duration),  # Cortar exatamente na duração do teaser
@@ -193,53 +315,36 @@ def add_bgm_to_teaser(teaser_path, bgm_path, output_path):
         temp_bgm
     ]
     
-    result0 = subprocess.run(cmd_bgm_adjust, capture_output=True, text=True)
-    if result0.returncode != 0:
-        print(f"    ❌ Erro ao ajustar BGM: {result0.stderr[:200]}")
+    returncode0, stderr0 = run_ffmpeg(cmd_bgm_adjust)
+    if returncode0 != 0:
+        print(f"    ❌ Erro ao ajustar BGM: {stderr0[-300:]}")
         return False
     
-    # Passo 1: Mesclar áudios (agora ambos têm a mesma duração)
-    cmd_audio = [
+    # Passo 1: Mesclar áudios e remuxar com o vídeo original em uma única passada
+    # (SEM re-encodificação de vídeo e sem arquivo de áudio intermediário)
+    cmd_merge = [
         'ffmpeg', '-y',
+        '-hide_banner', '-loglevel', 'error',  # stderr só com erros
         '-i', teaser_path,
         '-i', temp_bgm,
-        '-filter_complex', f'[1:a]volume={BGM_VOLUME_DB}dB[bgm];[0:a][bgm]amix=inputs=2:duration=first:dropout_transition=0[audio_mixed];[audio_mixed]afade=t=out:st={fade_start:.1f}:d={FADE_OUT_DURATION}[audio]',
-        '-map', '[audio]',
+        '-filter_complex', BGM_FILTER_TEMPLATE.format(volume=BGM_VOLUME_DB, fade_start=fade_start, fade_duration=FADE_OUT_DURATION),
+        '-map', '0:v',      # Vídeo do teaser
+        '-map', '[audio]',  # Áudio mesclado
+        '-c:v', 'copy',     # Manter codec original (hevc) - SEM re-encodificação!
         '-c:a', 'aac',
         '-b:a', '128k',
-        temp_audio
-    ]
-    
-    print(f"    🔧 Passo 1/3: Mesclando áudios...")
-    result1 = subprocess.run(cmd_audio, capture_output=True, text=True)
-    
-    if result1.returncode != 0:
-        print(f"    ❌ Erro na mesclagem de áudio: {result1.stderr}")
-        return False
-    
-    # Passo 2: Combinar vídeo original com áudio mesclado (SEM re-encodificação de vídeo!)
-    cmd_video = [
-        'ffmpeg', '-y',
-        '-i', teaser_path,  # Vídeo original
-        '-i', temp_audio,   # Áudio mesclado
-        '-c:v', 'copy',     # Manter codec original (hevc) - SEM re-encodificação!
-        '-c:a', 'copy',     # Copiar áudio mesclado
-        '-map', '0:v',      # Vídeo do primeiro input
-        '-map', '1:a',      # Áudio do segundo input
         output_path
     ]
     
-    print(f"    🔧 Passo 2/3: Combinando vídeo + áudio mesclado...")
-    result2 = subprocess.run(cmd_video, capture_output=True, text=True)
+    print(f"    🔧 Passo 1/1: Mesclando áudios + combinando com o vídeo...")
+    returncode1, stderr1 = run_ffmpeg(cmd_merge)
     
-    # Limpar arquivos temporários
-    if os.path.exists(temp_audio):
-        os.remove(temp_audio)
+    # Limpar arquivo temporário
     if os.path.exists(temp_bgm):
         os.remove(temp_bgm)
     
-    if result2.returncode != 0:
-        print(f"    ❌ Erro na combinação vídeo+áudio: {result2.stderr}")
+    if returncode1 != 0:
+        print(f"    ❌ Erro na mesclagem: {stderr1}")
         return False
     
     merge_time = time.time() - merge_start
@@ -293,7 +398,7 @@ def main():
     output_path = os.path.join(OUTPUT_DIR, output_filename)
     
     # Mesclar teaser com BGM
-    if not add_bgm_to_teaser(teaser_path, bgm_info['path'], output_path):
+    if not add_bgm_to_teaser(teaser_path, bgm_info['path'], output_path, teaser_duration, bgm_info['duration']):
         print("❌ Erro ao mesclar teaser com BGM!")
         return
     
@@ -306,9 +411,11 @@ def main():
     print(f"🔊 Volume BGM: {BGM_VOLUME_DB}dB | Fade out: {FADE_OUT_DURATION}s")
     print(f"⏱️  Tempo total: {format_time(total_time)}")
     
-    if os.path.exists(output_path):
-        file_size = os.path.getsize(output_path) / (1024 * 1024)
+    try:
+        file_size = os.stat(output_path).st_size / (1024 * 1024)
         print(f"📊 Tamanho: {file_size:.2f} MB")
+    except FileNotFoundError:
+        pass
     
     print("\n🚀 OTIMIZAÇÕES APLICADAS:")
     print("   • SELEÇÃO automática de BGM adequado")
@@ -6,10 +6,12 @@ Etapa 4: Criar versão final com teaser no início + vídeo completo
 
 import os
 import subprocess
-from pathlib import Path
+import json
 from datetime import datetime
 import time
 
+from pipeline_utils import escape_concat_path, file_cache_key, load_probe_cache, run_ffmpeg, save_probe_cache
+
 # =============================================================================
 # CONFIGURAÇÕES - ALTERE AQUI CONFORME NECESSÁRIO
 # =============================================================================
@@ -18,48 +20,77 @@ import time
 INPUT_DIR = "output"
 OUTPUT_DIR = "output"
 
+# Entradas de cada diretório, varridas uma vez por execução (validate_config)
+DIR_ENTRIES = {}
+
+# Cache de ffprobe em memória (arquivo e formato das entradas em pipeline_utils)
+PROBE_CACHE = {}
+
+# Verificação de compatibilidade antes do concat (senão só roda como diagnóstico se o concat falhar)
+CHECK_COMPATIBILITY = False
+
 # Configurações de vídeo - ULTRA OTIMIZADO PARA 4K
 # NOTA: Usando copy codec - SEM re-encodificação!
 
 # =============================================================================
 
+def list_dir(directory):
+    """Entradas do diretório (varre uma vez por execução e reaproveita)
+    
+    O diretório é resolvido para caminho absoluto, então entry.path já sai absoluto.
+    """
+    if directory not in DIR_ENTRIES:
+        with os.scandir(os.path.abspath(directory)) as entries:
+            DIR_ENTRIES[directory] = list(entries)
+    return DIR_ENTRIES[directory]
+
 def validate_config():
-    """Valida as configurações do programa"""
-    if not os.path.exists(INPUT_DIR):
+    """Valida as configurações do programa (a varredura do diretório já fica guardada para os finders)"""
+    try:
+        list_dir(INPUT_DIR)
+    except OSError:
         print(f"❌ Diretório de entrada '{INPUT_DIR}' não encontrado!")
         return False
     return True
 
-def get_video_properties(video_path):
-    """Obtém propriedades detalhadas do vídeo usando ffprobe"""
+def get_video_properties(video_path, use_cache=True):
+    """Obtém propriedades detalhadas do vídeo usando ffprobe (consulta o cache primeiro)
+    
+    use_cache=False ignora e não grava o cache (ex.: arquivo final, que é regravado a cada execução).
+    """
     try:
+        key = file_cache_key(video_path) if use_cache else None
+        cached = PROBE_CACHE.get(key, {}) if use_cache else {}
+        if 'ffprobe' in cached:
+            return cached['ffprobe']
+        
         cmd = ['ffprobe', '-v', 'quiet', '-print_format', 'json', 
                '-show_format', '-show_streams', video_path]
         result = subprocess.run(cmd, capture_output=True, text=True)
         if result.returncode == 0:
-            import json
-            return json.loads(result.stdout)
+            data = json.loads(result.stdout)
+            if use_cache:
+                PROBE_CACHE.setdefault(key, {})['ffprobe'] = data
+            return data
     except Exception as e:
         print(f"    ⚠️ Erro ao obter propriedades: {e}")
     return None
 
-def get_video_duration(video_path):
-    """Obtém duração do vídeo usando ffprobe"""
+def get_video_duration(video_path, use_cache=True):
+    """Obtém duração do vídeo a partir do mesmo ffprobe (JSON) das propriedades"""
+    props = get_video_properties(video_path, use_cache)
     try:
-        cmd = ['ffprobe', '-v', 'quiet', '-show_entries', 'format=duration', 
-               '-of', 'default=noprint_wrappers=1:nokey=1', video_path]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0:
-            return float(result.stdout.strip())
-    except:
-        pass
-    return None
+        return float(props['format']['duration'])
+    except (TypeError, KeyError, ValueError):
+        return None
+
+def scan_files(directory, suffix):
+    """Arquivos do diretório cujo nome termina com o sufixo (sem diferenciar maiúsculas)"""
+    return [entry for entry in list_dir(directory) if entry.is_file() and entry.name.lower().endswith(suffix)]
 
 def find_latest_teaser_with_bgm():
     """Encontra o teaser com BGM mais recente"""
-    teaser_files = []
-    for pattern in ['*teaser_with_bgm.mp4', '*teaser_with_bgm.MP4']:
-        teaser_files.extend(Path(INPUT_DIR).glob(pattern))
+    teaser_files = scan_files(INPUT_DIR, 'teaser_with_bgm.mp4')
     
     if not teaser_files:
         print(f"❌ Nenhum teaser com BGM encontrado na pasta '{INPUT_DIR}'")
@@ -67,13 +98,11 @@ def find_latest_teaser_with_bgm():
     
     latest_teaser = max(teaser_files, key=lambda x: x.stat().st_mtime)
     print(f"    📁 Teaser com BGM selecionado: {latest_teaser.name}")
-    return str(latest_teaser)
+    return latest_teaser.path
 
 def find_latest_concatenated():
     """Encontra o vídeo concatenado mais recente"""
-    video_files = []
-    for pattern in ['*concatenated_videos.mp4', '*concatenated_videos.MP4']:
-        video_files.extend(Path(INPUT_DIR).glob(pattern))
+    video_files = scan_files(INPUT_DIR, 'concatenated_videos.mp4')
     
     if not video_files:
         print(f"❌ Nenhum vídeo concatenado encontrado na pasta '{INPUT_DIR}'")
@@ -81,7 +110,7 @@ def find_latest_concatenated():
     
     latest_video = max(video_files, key=lambda x: x.stat().st_mtime)
     print(f"    📁 Vídeo concatenado selecionado: {latest_video.name}")
-    return str(latest_video)
+    return latest_video.path
 
 def check_video_compatibility(teaser_path, concatenated_path):
     """Verifica se os vídeos são compatíveis para concatenação"""
@@ -153,8 +182,8 @@ def create_final_video(teaser_path, concatenated_path, output_path):
     print("🎬 Passo 2/2: CRIANDO vídeo final (teaser + vídeo completo)...")
     merge_start = time.time()
     
-    # Verificar compatibilidade antes de prosseguir
-    if not check_video_compatibility(teaser_path, concatenated_path):
+    # Verificar compatibilidade antes de prosseguir (opcional: o concat usa -c copy de qualquer forma)
+    if CHECK_COMPATIBILITY and not check_video_compatibility(teaser_path, concatenated_path):
         print("    ⚠️ Continuando mesmo com incompatibilidades...")
     
     # Obter durações para debug
@@ -168,24 +197,25 @@ def create_final_video(teaser_path, concatenated_path, output_path):
         expected_duration = teaser_duration + concatenated_duration
         print(f"    🔍 DEBUG - Duração esperada do resultado: {expected_duration:.1f}s ({expected_duration/60:.1f} min)")
     
-    # Criar arquivo de lista para concat demuxer
-    list_file = os.path.join(OUTPUT_DIR, "final_video_list.txt")
-    with open(list_file, 'w') as f:
-        f.write(f"file '{os.path.abspath(teaser_path)}'\n")
-        f.write(f"file '{os.path.abspath(concatenated_path)}'\n")
+    # Lista do concat demuxer enviada pelo stdin (sem arquivo temporário em disco)
+    list_lines = [
+        f"file '{escape_concat_path(teaser_path)}'",  # finders já retornam caminhos absolutos
+        f"file '{escape_concat_path(concatenated_path)}'",
+    ]
+    list_data = ("\n".join(list_lines) + "\n").encode('utf-8')
     
-    # DEBUG: Mostrar conteúdo do arquivo de lista
-    print(f"    🔍 DEBUG - Conteúdo do arquivo de lista:")
-    with open(list_file, 'r') as f:
-        for i, line in enumerate(f, 1):
-            print(f"      {i}: {line.strip()}")
+    # DEBUG: Mostrar conteúdo da lista
+    print(f"    🔍 DEBUG - Conteúdo da lista (stdin):")
+    for i, line in enumerate(list_lines, 1):
+        print(f"      {i}: {line}")
     
     # Comando FFmpeg para concatenar teaser + vídeo concatenado (SEM re-encodificação!)
     cmd = [
-        'ffmpeg', '-y',
+        'ffmpeg', '-y', '-nostats',
         '-f', 'concat',
         '-safe', '0',
-        '-i', list_file,
+        '-protocol_whitelist', 'file,pipe',
+        '-i', 'pipe:0',
         '-c', 'copy',  # Apenas copy codec - SEM re-encodificação!
         '-avoid_negative_ts', 'make_zero',
         output_path
@@ -194,22 +224,21 @@ def create_final_video(teaser_path, concatenated_path, output_path):
     print(f"    🔧 Mesclando teaser + vídeo completo...")
     print(f"    🔍 DEBUG - Comando: {' '.join(cmd)}")
     
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    returncode, stderr = run_ffmpeg(cmd, list_data)
     
-    # DEBUG: Mostrar stderr se houver
-    if result.stderr:
-        print(f"    🔍 DEBUG - FFmpeg stderr: {result.stderr}")
+    # DEBUG: Mostrar stderr se houver (últimas linhas)
+    if stderr:
+        print(f"    🔍 DEBUG - FFmpeg stderr: {stderr}")
     
-    # Limpar arquivo de lista
-    if os.path.exists(list_file):
-        os.remove(list_file)
-    
-    if result.returncode != 0:
-        print(f"    ❌ Erro na mesclagem: {result.stderr}")
+    if returncode != 0:
+        print(f"    ❌ Erro na mesclagem: {stderr}")
+        # Diagnóstico: mostra as diferenças entre os vídeos
+        if not CHECK_COMPATIBILITY:
+            check_video_compatibility(teaser_path, concatenated_path)
         return False
     
     # DEBUG: Verificar duração do arquivo final
-    final_duration = get_video_duration(output_path)
+    final_duration = get_video_duration(output_path, use_cache=False)  # saída muda a cada execução: não vai para o cache
     print(f"    🔍 DEBUG - Duração do arquivo final: {final_duration:.1f}s ({final_duration/60:.1f} min)" if final_duration else "    🔍 DEBUG - Não foi possível obter duração do arquivo final")
     
     if final_duration and teaser_duration and concatenated_duration:
@@ -243,6 +272,8 @@ def main():
     print("🚀 ULTRA OTIMIZADO: Teaser + Vídeo Completo = Arquivo Final!")
     print("=" * 60)
     
+    PROBE_CACHE.update(load_probe_cache())
+    
     # Encontrar teaser com BGM mais recente
     teaser_path = find_latest_teaser_with_bgm()
     if not teaser_path:
@@ -263,7 +294,9 @@ def main():
     output_path = os.path.join(OUTPUT_DIR, output_filename)
     
     # Criar vídeo final
-    if not create_final_video(teaser_path, concatenated_path, output_path):
+    success = create_final_video(teaser_path, concatenated_path, output_path)
+    save_probe_cache(PROBE_CACHE)
+    if not success:
         print("❌ Erro ao criar arquivo final!")
         return
     
@@ -275,9 +308,11 @@ def main():
     print(f"🎬 Estrutura: Teaser com BGM + Vídeo Completo")
     print(f"⏱️  Tempo total: {format_time(total_time)}")
     
-    if os.path.exists(output_path):
-        file_size = os.path.getsize(output_path) / (1024 * 1024)
+    try:
+        file_size = os.stat(output_path).st_size / (1024 * 1024)
         print(f"📊 Tamanho: {file_size:.2f} MB")
+    except FileNotFoundError:
+        pass
     
     print("\n🚀 OTIMIZAÇÕES APLICADAS:")
     print("   • CONCATENAÇÃO inteligente de teaser + vídeo completo")
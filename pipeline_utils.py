@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Funções compartilhadas entre as etapas do pipeline
+==================================================
+Mantidas num só lugar para que as etapas interpretem os mesmos dados do mesmo jeito.
+"""
+
+import os
+import json
+import subprocess
+import threading
+from collections import deque
+
+# orjson é opcional (parse/serialização em C); sem ele usa o json da biblioteca padrão
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Linhas finais do stderr do ffmpeg guardadas para diagnóstico
+STDERR_TAIL_LINES = 100
+
+# Cache de ffprobe compartilhado pelas etapas 2B e 4 (chave: file_cache_key). Cada etapa guarda
+# seu próprio campo na entrada: a 2B 'duration'/'props', a 4 'ffprobe' (JSON completo)
+PROBE_CACHE_FILE = os.path.join("output", "probe_cache.json")
+
+
+def parse_selected_ids(response_text):
+    """IDs de segmentos da resposta do GPT ("3, 17, 42")
+    
+    Só aceita tokens separados por vírgula que sejam inteiramente numéricos; texto solto
+    ("15 e 20", "IDs: 3") é descartado. A etapa 2 (seleção) e a etapa 2B (lower thirds)
+    usam esta mesma função para chegarem à mesma lista de IDs.
+    """
+    tokens = (token.strip() for token in response_text.split(','))
+    return [int(token) for token in tokens if token.isdigit()]
+
+def json_loads(data):
+    """Decodifica JSON (str ou bytes) com orjson quando disponível"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def json_dumps(data):
+    """Serializa para JSON indentado em bytes UTF-8 (com orjson quando disponível)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
+def read_json(path):
+    """Lê um arquivo JSON (bytes direto para o parser)"""
+    with open(path, 'rb') as f:
+        return json_loads(f.read())
+
+def write_json(path, data):
+    """Grava JSON indentado em UTF-8"""
+    with open(path, 'wb') as f:
+        f.write(json_dumps(data))
+
+def file_cache_key(file_path):
+    """Chave de cache: caminho absoluto + mtime + tamanho (muda se o arquivo mudar)"""
+    st = os.stat(file_path)
+    return f"{os.path.abspath(file_path)}:{st.st_mtime_ns}:{st.st_size}"
+
+def load_probe_cache():
+    """Carrega o cache de ffprobe se existir"""
+    try:
+        return read_json(PROBE_CACHE_FILE)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"    ⚠️ Erro ao carregar cache de ffprobe: {e}")
+    return {}
+
+def save_probe_cache(probe_cache):
+    """Salva o cache de ffprobe (entradas de todas as etapas que o usam)"""
+    try:
+        os.makedirs(os.path.dirname(PROBE_CACHE_FILE), exist_ok=True)
+        write_json(PROBE_CACHE_FILE, probe_cache)
+    except Exception as e:
+        print(f"    ⚠️ Erro ao salvar cache de ffprobe: {e}")
+
+def escape_concat_path(path):
+    """Escapa apóstrofos de um caminho para uso entre aspas simples na lista do concat demuxer
+    
+    Vale tanto para a lista gravada em arquivo (etapa 1) quanto para a enviada pelo stdin (etapas 2 e 4).
+    """
+    return path.replace("'", "'\\''")
+
+def run_ffmpeg(cmd, input_data=None):
+    """Executa ffmpeg guardando só as últimas linhas do stderr (buffer circular)
+    
+    input_data (bytes), se fornecido, é enviado pelo stdin (pipe:0) numa thread separada,
+    enquanto o stderr é consumido aqui: se o ffmpeg encher o pipe do stderr antes de ler
+    todo o stdin, nenhum dos dois lados fica bloqueado esperando o outro.
+    Retorna (returncode, últimas linhas do stderr).
+    """
+    stdin = subprocess.PIPE if input_data is not None else subprocess.DEVNULL
+    with subprocess.Popen(cmd, stdin=stdin, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE) as proc:
+        writer = None
+        if input_data is not None:
+            writer = threading.Thread(target=_write_stdin, args=(proc.stdin, input_data), daemon=True)
+            writer.start()
+        tail = deque((line.decode('utf-8', errors='replace') for line in proc.stderr), maxlen=STDERR_TAIL_LINES)
+        if writer is not None:
+            writer.join()
+        returncode = proc.wait()
+    return returncode, ''.join(tail)
+
+def _write_stdin(pipe, data):
+    """Escreve data no stdin do processo e fecha (o ffmpeg pode sair antes de ler tudo)"""
+    try:
+        pipe.write(data)
+    except BrokenPipeError:
+        pass
+    finally:
+        try:
+            pipe.close()
+        except BrokenPipeError:
+            pass